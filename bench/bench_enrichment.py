@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the etl_transform enrichment stages
+
+Builds synthetic swap frames shaped like the Hasura response and reports
+per-stage wall time and peak traced memory. Runs are reproducible for a given
+--seed. With --compare-legacy the original per-row apply() implementations are
+timed as well and both pipelines must produce byte-identical CSV output.
+
+Usage:
+    python3 bench/bench_enrichment.py --sizes 10000,1000000,10000000
+"""
+
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'scripts'))
+
+import etl_transform  # noqa: E402
+import rpc_cache  # noqa: E402
+
+FINAL_COLUMNS = [
+    'block_time', 'tx_hash', 'log_index', 'pool_address',
+    'token0', 'token1', 'amount0', 'amount1',
+    'price0_usd', 'price1_usd', 'trader', 'is_contract',
+    'flow_source', 'hop_index', 'gas_used'
+]
+
+POOLS = [
+    '0x410723c1949069324d0f6013dba28829c4a0562f7c81d0f7cb79ded668691e1f',
+    '0x51f9d63dda41107d6513047f7ed18133346ce4f3f4c4faf899151d8939b3496e',
+]
+
+# Mixed-case addresses so lower-casing is exercised; two of them are priced
+TOKENS = [
+    '0x2260FAC5E5542a773Aa44fBCfeDf7C193bc2C599',
+    '0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2',
+    '0x0000000000000000000000000000000000000000',
+    '0x078D782b760474a361dDA0AF3839290b0EF57AD6',
+]
+
+
+class StubRpc:
+    """Answers receipt lookups instantly so the gas stage measures pandas work only"""
+
+    @staticmethod
+    def receipt(tx_hash):
+        return {'transactionHash': tx_hash, 'gasUsed': hex(150000), 'effectiveGasPrice': hex(1000)}
+
+    def call(self, method, params):
+        return self.receipt(params[0])
+
+    def batch(self, calls):
+        return [self.receipt(params[0]) for _, params in calls]
+
+
+def random_hex(rng, count, nbytes, mixed_case=False):
+    """Generate count random 0x-prefixed hex strings of nbytes bytes"""
+    encoded = rng.bytes(count * nbytes).hex().encode('ascii')
+    values = np.frombuffer(encoded, dtype=f'S{2 * nbytes}').astype(str)
+    if mixed_case:
+        values[::2] = np.char.upper(values[::2])
+    return np.char.add('0x', values).astype(object)
+
+
+def make_swaps(rows, seed=7, byte_hashes=False):
+    """Build a synthetic swap frame with multi-hop txs and repeated senders"""
+    rng = np.random.default_rng(seed)
+
+    # ~1.9 hops per tx: every row picks a tx id from a sorted range of rows*2/3
+    tx_ids = np.sort(rng.integers(0, max(rows * 2 // 3, 1), rows))
+    _, first_rows, tx_codes = np.unique(tx_ids, return_index=True, return_inverse=True)
+    log_index = np.arange(rows) - first_rows[tx_codes]
+    tx_hashes = random_hex(rng, len(first_rows), 32)[tx_codes]
+    if byte_hashes:
+        tx_hashes = np.array([bytes.fromhex(h[2:]) for h in tx_hashes], dtype=object)
+
+    block_number = 1_000_000 + tx_codes // 3
+    labels = pd.read_csv(os.path.join(REPO_ROOT, 'address_labels.csv'))['address'].to_numpy(dtype=object)
+    senders = np.concatenate([random_hex(rng, max(rows // 20, 100), 20, mixed_case=True), labels])
+
+    df = pd.DataFrame({
+        'block_time': pd.Timestamp('2026-01-01') + pd.to_timedelta(block_number - 1_000_000, unit='s'),
+        'block_number': block_number,
+        'tx_hash': tx_hashes,
+        'log_index': log_index,
+        'pool_address': np.array(POOLS, dtype=object)[rng.integers(0, len(POOLS), rows)],
+        'token0': np.array(TOKENS, dtype=object)[rng.integers(0, len(TOKENS), rows)],
+        'token1': np.array(TOKENS, dtype=object)[rng.integers(0, len(TOKENS), rows)],
+        'amount0': rng.integers(-10**12, 10**12, rows),
+        'amount1': rng.integers(-10**12, 10**12, rows),
+        'sender': senders[rng.integers(0, len(senders), rows)],
+    })
+    # Shuffle so compute_hop_indices has real sorting to do
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+# Original per-row implementations, kept for --compare-legacy
+
+def legacy_enrich_with_gas(swaps_df, rpc):
+    swaps_df['tx_hash_hex'] = swaps_df['tx_hash'].apply(
+        lambda x: x.hex() if isinstance(x, bytes) else x
+    )
+    gas_map = {}
+    for tx_hash in swaps_df['tx_hash_hex'].unique():
+        if not tx_hash.startswith('0x'):
+            tx_hash = '0x' + tx_hash
+        gas_map[tx_hash] = int(rpc.call('eth_getTransactionReceipt', [tx_hash])['gasUsed'], 16)
+    # Map through 0x-prefixed keys so byte hashes get their gas as well
+    swaps_df['gas_used'] = swaps_df['tx_hash_hex'].apply(
+        lambda x: x if x.startswith('0x') else '0x' + x
+    ).map(gas_map).fillna(0)
+    return swaps_df
+
+
+def legacy_enrich_with_prices(swaps_df):
+    price_map = {
+        '0x2260fac5e5542a773aa44fbcfedf7c193bc2c599': 95000.0,
+        '0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2': 3500.0,
+    }
+    swaps_df['price0_usd'] = swaps_df['token0'].apply(
+        lambda x: price_map.get(x.lower() if isinstance(x, str) else x, 0)
+    )
+    swaps_df['price1_usd'] = swaps_df['token1'].apply(
+        lambda x: price_map.get(x.lower() if isinstance(x, str) else x, 0)
+    )
+    return swaps_df
+
+
+def legacy_enrich_with_labels(swaps_df):
+    labels_df = pd.read_csv('address_labels.csv')
+    labels_df['address'] = labels_df['address'].str.lower()
+    swaps_df['trader'] = swaps_df['sender'].apply(
+        lambda x: x.lower() if isinstance(x, str) else x
+    )
+    swaps_df = swaps_df.merge(
+        labels_df[['address', 'flow_source', 'is_contract']],
+        left_on='trader',
+        right_on='address',
+        how='left'
+    )
+    swaps_df['flow_source'] = swaps_df['flow_source'].fillna('Other')
+    swaps_df['is_contract'] = swaps_df['is_contract'].fillna(False)
+    return swaps_df
+
+
+def stages(impl, rpc):
+    """Ordered (name, function) stages for one implementation"""
+    if impl == 'legacy':
+        return [
+            ('gas', lambda df: legacy_enrich_with_gas(df, rpc)),
+            ('prices', legacy_enrich_with_prices),
+            ('labels', legacy_enrich_with_labels),
+            ('hop_indices', etl_transform.compute_hop_indices),
+        ]
+    return [
+        ('gas', lambda df: etl_transform.enrich_with_gas(df, rpc)),
+        ('prices', etl_transform.enrich_with_prices),
+        ('labels', etl_transform.enrich_with_labels),
+        ('hop_indices', etl_transform.compute_hop_indices),
+    ]
+
+
+def run_pipeline(df, impl, trace_memory):
+    """Run every stage in order; returns (final frame, [(stage, seconds, peak_mb)])"""
+    results = []
+    rpc = StubRpc()
+    # Fresh in-memory receipt cache so every run does the same lookups
+    rpc_cache._shared_cache = rpc_cache.RpcCache(':memory:')
+    for name, stage in stages(impl, rpc):
+        if trace_memory:
+            tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        df = stage(df)
+        elapsed = time.perf_counter() - start
+        peak_mb = None
+        if trace_memory:
+            peak_mb = (tracemalloc.get_traced_memory()[1] - baseline) / 2**20
+            tracemalloc.stop()
+        results.append((name, elapsed, peak_mb))
+    return df, results
+
+
+def csv_bytes(df):
+    return df[FINAL_COLUMNS].to_csv(index=False).encode()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000,1000000,10000000',
+                        help="comma-separated row counts (default: 10k, 1M, 10M)")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--byte-hashes', action='store_true',
+                        help="generate tx_hash as bytes to exercise the hex conversion")
+    parser.add_argument('--skip-memory', action='store_true',
+                        help="skip the tracemalloc pass (it slows Python-level code)")
+    parser.add_argument('--compare-legacy', action='store_true',
+                        help="also time the original apply() stages and check identical output")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # enrich_with_labels reads address_labels.csv from the working directory
+    os.chdir(REPO_ROOT)
+    impls = ['legacy', 'vectorized'] if args.compare_legacy else ['vectorized']
+
+    print(f"{'rows':>10}  {'impl':<10}  {'stage':<12}  {'time_s':>8}  {'peak_mb':>8}")
+    for rows in [int(size) for size in args.sizes.split(',')]:
+        outputs = {}
+        for impl in impls:
+            df, timings = run_pipeline(make_swaps(rows, args.seed, args.byte_hashes), impl, False)
+            outputs[impl] = csv_bytes(df) if args.compare_legacy else None
+            del df
+            peaks = {}
+            if not args.skip_memory:
+                df, traced = run_pipeline(make_swaps(rows, args.seed, args.byte_hashes), impl, True)
+                peaks = {name: peak for name, _, peak in traced}
+                del df
+            for name, elapsed, _ in timings:
+                peak = f"{peaks[name]:8.1f}" if name in peaks else f"{'-':>8}"
+                print(f"{rows:>10}  {impl:<10}  {name:<12}  {elapsed:8.3f}  {peak}")
+            total = sum(elapsed for _, elapsed, _ in timings)
+            print(f"{rows:>10}  {impl:<10}  {'total':<12}  {total:8.3f}")
+
+        if args.compare_legacy:
+            same = outputs['legacy'] == outputs['vectorized']
+            print(f"{rows:>10}  output identical: {same}")
+            if not same:
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+In-process mock JSON-RPC node and Hasura GraphQL endpoint for offline benchmarks
+
+Both serve a synthetic swap dataset (see bench_pipeline.make_dataset) from a
+background thread. The RPC mock answers receipt, transaction and eth_getCode
+lookups with configurable latency and a requests-per-second quota (429 with
+Retry-After beyond it) and counts every call by method. The Hasura mock
+answers the keyset-paginated raw_unichain_swaps query used by etl_transform.
+"""
+
+import json
+import time
+import bisect
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockServer:
+    """ThreadingHTTPServer on a free local port, run in a daemon thread"""
+
+    def __init__(self, handler):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.server.daemon_threads = True
+        self.server.mock = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class JsonHandler(BaseHTTPRequestHandler):
+    """Keep-alive JSON POST handler; subclasses implement respond(body)"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, payload=None, headers=None):
+        data = json.dumps(payload).encode() if payload is not None else b''
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.respond(body)
+
+
+class RpcHandler(JsonHandler):
+    def respond(self, body):
+        mock = self.server.mock
+        calls = body if isinstance(body, list) else [body]
+        if not mock.admit(len(calls)):
+            mock.count('throttled')
+            self.send_json(429, headers={'Retry-After': '1'})
+            return
+        if mock.latency:
+            time.sleep(mock.latency)
+        results = [mock.handle(call) for call in calls]
+        self.send_json(200, results if isinstance(body, list) else results[0])
+
+
+class MockRpc(MockServer):
+    """
+    JSON-RPC node over the dataset. Receipts report gas derived from the tx
+    hash; addresses whose last byte is odd have contract code.
+    """
+
+    def __init__(self, blocks, latency_ms=0, rate_limit=0, head_block=None, support_block_receipts=True):
+        super().__init__(RpcHandler)
+        self.blocks = blocks                       # {block_number: [tx_hash hex, ...]}
+        self.tx_blocks = {tx: block for block, txs in blocks.items() for tx in txs}
+        self.latency = latency_ms / 1000
+        self.rate_limit = rate_limit               # calls per second, 0 = unlimited
+        self.head_block = head_block if head_block is not None else max(blocks, default=0)
+        self.support_block_receipts = support_block_receipts
+        self.calls = Counter()
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_calls = 0
+
+    def count(self, method, n=1):
+        with self.lock:
+            self.calls[method] += n
+
+    def total_calls(self):
+        with self.lock:
+            return sum(n for method, n in self.calls.items() if method != 'throttled')
+
+    def admit(self, n):
+        """Fixed one-second window quota, counting every call of a batch"""
+        if not self.rate_limit:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            if now - self.window_start >= 1:
+                self.window_start, self.window_calls = now, 0
+            if self.window_calls + n > self.rate_limit:
+                return False
+            self.window_calls += n
+            return True
+
+    def receipt(self, tx_hash):
+        block = self.tx_blocks[tx_hash]
+        return {
+            'transactionHash': tx_hash,
+            'blockNumber': hex(block),
+            'gasUsed': hex(60000 + int(tx_hash[-6:], 16) % 240000),
+            'effectiveGasPrice': hex(1000000 + block % 1000),
+        }
+
+    def handle(self, call):
+        method, params = call['method'], call.get('params', [])
+        self.count(method)
+        reply = {'jsonrpc': '2.0', 'id': call.get('id')}
+
+        if method == 'eth_blockNumber':
+            reply['result'] = hex(self.head_block)
+        elif method == 'eth_getBlockReceipts' and self.support_block_receipts:
+            reply['result'] = [self.receipt(tx) for tx in self.blocks.get(int(params[0], 16), [])]
+        elif method == 'eth_getTransactionReceipt':
+            reply['result'] = self.receipt(params[0]) if params[0] in self.tx_blocks else None
+        elif method == 'eth_getTransactionByHash':
+            reply['result'] = {'hash': params[0], 'gasPrice': self.receipt(params[0])['effectiveGasPrice']}
+        elif method == 'eth_getCode':
+            reply['result'] = '0x6080604052' if int(params[0][-2:], 16) % 2 else '0x'
+        else:
+            reply['error'] = {'code': -32601, 'message': f"the method {method} does not exist/is not available"}
+        return reply
+
+
+class HasuraHandler(JsonHandler):
+    def respond(self, body):
+        mock = self.server.mock
+        variables = body.get('variables') or {}
+        pools = {pool.lower().replace('\\x', '0x') for pool in variables.get('pools') or []}
+        after = (variables.get('afterBlock', -1), variables.get('afterLogIndex', -1))
+        limit = variables.get('limit', 1000)
+        mock.pages += 1
+
+        rows = []
+        position = bisect.bisect_right(mock.keys, after)
+        while position < len(mock.rows) and len(rows) < limit:
+            row = mock.rows[position]
+            if not pools or row['pool_address'].replace('\\x', '0x') in pools:
+                rows.append(row)
+            position += 1
+        self.send_json(200, {'data': {'raw_unichain_swaps': rows}})
+
+
+class MockHasura(MockServer):
+    """GraphQL endpoint answering the paginated swap query from etl_transform"""
+
+    def __init__(self, rows):
+        super().__init__(HasuraHandler)
+        # Rows sorted by (block_number, log_index), bytea rendered the way Hasura does
+        self.rows = sorted(rows, key=lambda row: (row['block_number'], row['log_index']))
+        self.keys = [(row['block_number'], row['log_index']) for row in self.rows]
+        self.pages = 0
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Buffered bulk writes for the enrichment tables
+
+Rows are buffered in memory and flushed with COPY into a temporary staging
+table (temp tables skip the WAL), then merged into the target with one
+INSERT ... SELECT ... ON CONFLICT statement. Each flush commits, so a crash
+loses at most one buffer of work.
+"""
+
+import io
+import os
+import csv
+import time
+
+import metrics
+
+# Rows buffered before a flush
+BULK_FLUSH_ROWS = int(os.getenv('BULK_FLUSH_ROWS', '5000'))
+# Oldest buffered row age that forces a flush, so slow RPC work still lands
+BULK_FLUSH_SECONDS = float(os.getenv('BULK_FLUSH_SECONDS', '30'))
+
+
+def csv_value(value):
+    """Python value as COPY ... CSV text (None stays NULL)"""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return '\\x' + bytes(value).hex()
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return value
+
+
+class BulkWriter:
+    """
+    Buffer rows for one table and flush them through a staging table.
+
+    staging_ddl creates the temp staging table; merge_sql moves its rows into
+    the target (it must de-duplicate the staging rows itself).
+    """
+
+    def __init__(self, conn, staging_table, columns, staging_ddl, merge_sql,
+                 flush_rows=BULK_FLUSH_ROWS, flush_seconds=BULK_FLUSH_SECONDS, commit=True):
+        self.conn = conn
+        self.staging_table = staging_table
+        self.columns = columns
+        self.staging_ddl = staging_ddl
+        self.merge_sql = merge_sql
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.commit = commit
+        self.rows = []
+        self.first_buffered = None
+        self.written = 0
+
+    def add_many(self, rows):
+        """Buffer rows (tuples in column order); flushes when the buffer is full or old"""
+        if self.first_buffered is None:
+            self.first_buffered = time.monotonic()
+        self.rows.extend(rows)
+        if len(self.rows) >= self.flush_rows or time.monotonic() - self.first_buffered >= self.flush_seconds:
+            self.flush()
+
+    def add(self, row):
+        self.add_many([row])
+
+    def flush(self):
+        """COPY the buffer into staging, merge it into the target and commit; returns rows merged"""
+        if not self.rows:
+            return 0
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows([csv_value(value) for value in row] for row in self.rows)
+        buffer.seek(0)
+
+        with self.conn.cursor() as cursor, metrics.db_timer(f"bulk_{self.staging_table}"):
+            cursor.execute(self.staging_ddl)
+            cursor.copy_expert(
+                f"COPY {self.staging_table} ({', '.join(self.columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+            cursor.execute(self.merge_sql)
+            merged = cursor.rowcount
+            cursor.execute(f"TRUNCATE {self.staging_table}")
+        if self.commit:
+            self.conn.commit()
+
+        self.written += len(self.rows)
+        self.rows = []
+        self.first_buffered = None
+        return merged
+
+    def close(self):
+        """Flush what is left"""
+        return self.flush()
+
+
+def tx_gas_writer(conn, **kwargs):
+    """Bulk writer for (tx_hash, gas_used, gas_price) rows; existing tx_gas rows are kept"""
+    return BulkWriter(
+        conn, 'tx_gas_staging', ['tx_hash', 'gas_used', 'gas_price'],
+        """
+        CREATE TEMP TABLE IF NOT EXISTS tx_gas_staging (
+            tx_hash BYTEA,
+            gas_used BIGINT,
+            gas_price BIGINT
+        )
+        """,
+        """
+        INSERT INTO tx_gas (tx_hash, gas_used, gas_price)
+        SELECT DISTINCT ON (tx_hash) tx_hash, gas_used, gas_price
+        FROM tx_gas_staging
+        ORDER BY tx_hash
+        ON CONFLICT (tx_hash) DO NOTHING
+        """,
+        **kwargs,
+    )
+
+
+def address_label_writer(conn, **kwargs):
+    """Bulk writer for (address, is_contract, code_checked_block) eth_getCode results"""
+    return BulkWriter(
+        conn, 'address_labels_staging', ['address', 'is_contract', 'code_checked_block'],
+        """
+        CREATE TEMP TABLE IF NOT EXISTS address_labels_staging (
+            address BYTEA,
+            is_contract BOOLEAN,
+            code_checked_block BIGINT
+        )
+        """,
+        """
+        INSERT INTO address_labels (address, is_contract, flow_source, code_checked_at, code_checked_block)
+        SELECT DISTINCT ON (address)
+            address, is_contract, CASE WHEN is_contract THEN 'Contract' ELSE 'EOA' END, NOW(), code_checked_block
+        FROM address_labels_staging
+        ORDER BY address, code_checked_block DESC
+        ON CONFLICT (address)
+        DO UPDATE SET
+            is_contract = EXCLUDED.is_contract,
+            flow_source = CASE
+                WHEN EXCLUDED.is_contract THEN 'Contract'
+                ELSE COALESCE(address_labels.flow_source, 'EOA')
+            END,
+            code_checked_at = EXCLUDED.code_checked_at,
+            code_checked_block = EXCLUDED.code_checked_block,
+            updated_at = NOW()
+        """,
+        **kwargs,
+    )
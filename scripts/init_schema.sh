@@ -53,4 +53,29 @@ VALUES
 ON CONFLICT (address) DO NOTHING;
 EOF
 
-echo "Schema initialization complete!" 
\ No newline at end of file
+# Register the target pools; add rows here (or directly in the pools table)
+# to load more pools, and set enabled = FALSE to stop loading one
+echo "Registering target pools..."
+psql -h "$DB_HOST" -p "$DB_PORT" -U "$DB_USER" -d "$DB_NAME" << EOF
+INSERT INTO pools (pool_address, label, is_hooked)
+VALUES
+    ('\x410723c1949069324d0f6013dba28829c4a0562f7c81d0f7cb79ded668691e1f'::bytea, 'Hooked pool', TRUE),
+    ('\x51f9d63dda41107d6513047f7ed18133346ce4f3f4c4faf899151d8939b3496e'::bytea, 'Static pool', FALSE)
+ON CONFLICT (pool_address) DO NOTHING;
+EOF
+
+# Insert token metadata for price computation
+# refresh_token_prices() prices tokens out from the is_stable ones (1 USD);
+# UniChain USDC anchors it. Add other stablecoins here, or daily USD prices
+# to token_price_anchors.
+echo "Inserting token metadata..."
+psql -h "$DB_HOST" -p "$DB_PORT" -U "$DB_USER" -d "$DB_NAME" << EOF
+INSERT INTO tokens (token_address, symbol, decimals, is_stable)
+VALUES
+    ('\x0000000000000000000000000000000000000000'::bytea, 'ETH', 18, FALSE),   -- native ETH in v4 pools
+    ('\x4200000000000000000000000000000000000006'::bytea, 'WETH', 18, FALSE),  -- OP Stack WETH predeploy
+    ('\x078d782b760474a361dda0af3839290b0ef57ad6'::bytea, 'USDC', 6, TRUE)     -- UniChain USDC
+ON CONFLICT (token_address) DO NOTHING;
+EOF
+
+echo "Schema initialization complete!"
\ No newline at end of file
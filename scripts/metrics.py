@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Prometheus metrics shared by the pipeline scripts
+
+Counters, gauges and histograms live in one in-process registry. Batch
+scripts (pipeline.py, etl_transform.py, ...) write it as a textfile to
+METRICS_DIR when they finish; the refresher daemon serves its own registry
+plus those textfiles on http://:METRICS_PORT/metrics, so one scrape of the
+refresher covers both the daily run and the near-real-time loads. Every
+sample carries a source label naming the script that produced it.
+
+Stage functions can also be run under cProfile (--profile on pipeline.py and
+etl_transform.py), dumping <stage>.prof and a text summary per stage.
+"""
+
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Where batch scripts write <source>.prom textfiles
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(REPO_ROOT, 'logs', 'metrics'))
+# Port of the refresher daemon's /metrics endpoint (0 = disabled)
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+# Script name attached to every sample as the source label
+SOURCE = os.path.splitext(os.path.basename(sys.argv[0]))[0] if sys.argv[0] not in ('', '-c') else 'python'
+
+RPC_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+DB_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    'univ4_stage_duration_seconds': ('gauge', 'Wall time of the last run of a stage', None),
+    'univ4_stage_rows': ('gauge', 'Rows handled by the last run of a stage', None),
+    'univ4_stage_runs_total': ('counter', 'Stage runs by outcome', None),
+    'univ4_stage_last_success_timestamp_seconds': ('gauge', 'Unix time a stage last succeeded', None),
+    'univ4_rpc_request_duration_seconds': ('histogram', 'JSON-RPC HTTP request latency by method', RPC_BUCKETS),
+    'univ4_rpc_calls_total': ('counter', 'JSON-RPC calls by method and outcome (batched calls count individually)', None),
+    'univ4_db_query_duration_seconds': ('histogram', 'Database query time by query', DB_BUCKETS),
+    'univ4_rpc_cache_lookups_total': ('counter', 'RPC cache lookups by namespace and result (memory, disk, miss)', None),
+    'univ4_indexer_lag_seconds': ('gauge', 'Age of the newest raw swap (indexer lag behind now)', None),
+    'univ4_fact_lag_blocks': ('gauge', 'Blocks of raw swaps not yet loaded as facts, per pool', None),
+    'univ4_work_queue_items_total': ('counter', 'Enrichment queue items by kind and outcome (enqueued, claimed, completed, requeued)', None),
+    'univ4_query_cache_lookups_total': ('counter', 'Query API lookups by query and result (hit, shared, miss, uncached, error)', None),
+    'univ4_query_cache_invalidations_total': ('counter', 'Query cache generations started by fact changes or reconnects', None),
+    'univ4_query_cache_entries': ('gauge', 'Entries in the query cache', None),
+    'univ4_query_cache_bytes': ('gauge', 'Encoded bytes held by the query cache', None),
+    'univ4_query_cache_generation': ('gauge', 'Current fact generation of the query cache', None),
+    'univ4_metrics_timestamp_seconds': ('gauge', 'Unix time these metrics were written', None),
+}
+
+
+def _family(name):
+    """Metric family of a sample name (histogram series share their family)"""
+    for suffix in ('_bucket', '_sum', '_count'):
+        if name.endswith(suffix) and name[:-len(suffix)] in METRICS:
+            return name[:-len(suffix)]
+    return name
+
+
+def _label_text(labels):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if value != float('inf') else '+Inf'
+
+
+class Registry:
+    """Thread-safe store of metric samples keyed by (name, labels)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}             # (name, labels) -> value
+        self.histograms = {}         # (name, labels) -> [bucket counts..., sum, count]
+        self.collectors = []
+
+    def _key(self, name, labels):
+        if name not in METRICS:
+            raise KeyError(f"unknown metric {name}")
+        return name, tuple(sorted({'source': SOURCE, **labels}.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.values[key] = value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        buckets = METRICS[name][2]
+        with self.lock:
+            series = self.histograms.setdefault(key, [0] * (len(buckets) + 2))
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def add_collector(self, func):
+        """Register a callable run before every export to refresh derived samples"""
+        self.collectors.append(func)
+
+    def samples(self):
+        """{family: [sample line, ...]} for the current registry"""
+        for collect in self.collectors:
+            try:
+                collect()
+            except Exception as e:
+                print(f"Warning: metrics collector failed: {e}")
+
+        families = {}
+        with self.lock:
+            for (name, labels), value in sorted(self.values.items()):
+                families.setdefault(name, []).append(f"{name}{_label_text(dict(labels))} {_number(value)}")
+            for (name, labels), series in sorted(self.histograms.items()):
+                labels = dict(labels)
+                lines = families.setdefault(name, [])
+                for bound, count in zip(METRICS[name][2] + (float('inf'),), series[:-2] + [series[-1]]):
+                    lines.append(f"{name}_bucket{_label_text({**labels, 'le': _number(bound)})} {count}")
+                lines.append(f"{name}_sum{_label_text(labels)} {_number(series[-2])}")
+                lines.append(f"{name}_count{_label_text(labels)} {series[-1]}")
+        return families
+
+    def render(self, extra_files=()):
+        """Prometheus text exposition of the registry merged with other textfiles"""
+        self.set('univ4_metrics_timestamp_seconds', time.time())
+        families = self.samples()
+        for path in extra_files:
+            try:
+                with open(path) as f:
+                    for line in f:
+                        line = line.strip()
+                        if line and not line.startswith('#'):
+                            name = line.split('{', 1)[0].split(' ', 1)[0]
+                            families.setdefault(_family(name), []).append(line)
+            except OSError:
+                continue
+
+        out = []
+        for name in sorted(families):
+            if name in METRICS:
+                kind, help_text, _ = METRICS[name]
+                out.append(f"# HELP {name} {help_text}")
+                out.append(f"# TYPE {name} {kind}")
+            out.extend(families[name])
+        return '\n'.join(out) + '\n'
+
+
+REGISTRY = Registry()
+inc = REGISTRY.inc
+set_gauge = REGISTRY.set
+observe = REGISTRY.observe
+add_collector = REGISTRY.add_collector
+
+
+@contextmanager
+def timer(name, **labels):
+    """Observe the wall time of the with-block in a histogram"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def db_timer(query):
+    return timer('univ4_db_query_duration_seconds', query=query)
+
+
+def record_stage(stage, status, seconds, rows=None):
+    inc('univ4_stage_runs_total', stage=stage, status=status)
+    set_gauge('univ4_stage_duration_seconds', seconds, stage=stage)
+    if rows is not None:
+        set_gauge('univ4_stage_rows', rows, stage=stage)
+    if status == 'succeeded':
+        set_gauge('univ4_stage_last_success_timestamp_seconds', time.time(), stage=stage)
+
+
+def record_rpc(method, seconds, calls, outcome):
+    """One JSON-RPC HTTP request carrying `calls` calls of `method`"""
+    observe('univ4_rpc_request_duration_seconds', seconds, method=method)
+    inc('univ4_rpc_calls_total', calls, method=method, outcome=outcome)
+
+
+def collect_cache_stats(cache):
+    """Mirror an RpcCache's lookup counters"""
+    for namespace, stats in list(cache.stats.items()):
+        for result, count in stats.items():
+            set_gauge('univ4_rpc_cache_lookups_total', count, namespace=namespace, result=result)
+
+
+def update_lag(conn):
+    """Indexer lag (newest raw swap vs now) and per-pool fact load lag in blocks"""
+    with db_timer('metrics_lag'), conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT EXTRACT(EPOCH FROM (NOW() AT TIME ZONE 'UTC') - block_time)
+            FROM raw_unichain_swaps
+            ORDER BY block_number DESC
+            LIMIT 1
+        """)
+        row = cursor.fetchone()
+        if row:
+            set_gauge('univ4_indexer_lag_seconds', float(row[0]))
+        cursor.execute("""
+            SELECT COALESCE(p.label, '0x' || encode(p.pool_address, 'hex')),
+                   COALESCE((SELECT MAX(s.block_number) FROM raw_unichain_swaps s
+                             WHERE s.pool_address = p.pool_address), 0)
+                   - COALESCE(w.last_block_number, 0)
+            FROM pools p
+            LEFT JOIN labs_solo.fact_load_watermark w ON w.pool_address = p.pool_address
+            WHERE p.enabled
+        """)
+        for pool, lag in cursor.fetchall():
+            set_gauge('univ4_fact_lag_blocks', max(lag, 0), pool=pool)
+    conn.commit()
+
+
+def write_textfile(metrics_dir=METRICS_DIR):
+    """Atomically write the registry to <metrics_dir>/<source>.prom"""
+    os.makedirs(metrics_dir, exist_ok=True)
+    path = os.path.join(metrics_dir, f"{SOURCE}.prom")
+    staging = f"{path}.tmp-{os.getpid()}"
+    with open(staging, 'w') as f:
+        f.write(REGISTRY.render())
+    os.replace(staging, path)
+    return path
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        own = os.path.join(self.server.metrics_dir, f"{SOURCE}.prom")
+        textfiles = [os.path.join(self.server.metrics_dir, name)
+                     for name in sorted(os.listdir(self.server.metrics_dir))
+                     if name.endswith('.prom') and os.path.join(self.server.metrics_dir, name) != own]
+        body = REGISTRY.render(textfiles).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(port=METRICS_PORT, metrics_dir=METRICS_DIR):
+    """Serve /metrics from a daemon thread; returns the server"""
+    os.makedirs(metrics_dir, exist_ok=True)
+    server = ThreadingHTTPServer(('', port), MetricsHandler)
+    server.daemon_threads = True
+    server.metrics_dir = metrics_dir
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@contextmanager
+def profiled(name, profile_dir=None):
+    """Run the with-block under cProfile, writing <name>.prof and <name>.txt to profile_dir"""
+    if not profile_dir:
+        yield
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        # Python 3.12+ allows one active profiler per process
+        print(f"Warning: not profiling {name}: {e}")
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(profile_dir, exist_ok=True)
+        profiler.dump_stats(os.path.join(profile_dir, f"{name}.prof"))
+        with open(os.path.join(profile_dir, f"{name}.txt"), 'w') as f:
+            pstats.Stats(profiler, stream=f).sort_stats('cumulative').print_stats(40)
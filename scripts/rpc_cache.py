@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Persistent cache for immutable RPC results shared by the enrichment scripts
+
+Receipts of mined blocks never change, and neither does the fact that an
+address holds contract code, so both are cached forever: an in-process LRU
+in front of an on-disk SQLite store.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+from collections import OrderedDict, defaultdict
+
+RPC_CACHE_PATH = os.getenv(
+    'RPC_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cache', 'rpc_cache.sqlite3'),
+)
+RPC_CACHE_LRU_SIZE = int(os.getenv('RPC_CACHE_LRU_SIZE', '100000'))
+
+# Namespaces
+RECEIPTS = 'receipt'   # tx hash -> {'gas_used', 'gas_price'}
+CODE = 'code'          # address -> {'is_contract', 'block'}
+
+# SQLite host parameter limit is 999 on older builds
+_SQL_CHUNK = 500
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+class RpcCache:
+    """In-process LRU in front of an on-disk SQLite store"""
+
+    def __init__(self, path=RPC_CACHE_PATH, lru_size=RPC_CACHE_LRU_SIZE):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.lru_size = lru_size
+        self.lru = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = defaultdict(lambda: {'memory': 0, 'disk': 0, 'miss': 0})
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS rpc_results (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID
+        """)
+        self.conn.commit()
+
+    def _remember(self, namespace, key, value):
+        self.lru[(namespace, key)] = value
+        self.lru.move_to_end((namespace, key))
+        while len(self.lru) > self.lru_size:
+            self.lru.popitem(last=False)
+
+    def get_many(self, namespace, keys):
+        """Look up keys; returns {key: value} for the ones cached"""
+        found = {}
+        with self.lock:
+            stats = self.stats[namespace]
+            missing = []
+            for key in dict.fromkeys(keys):
+                value = self.lru.get((namespace, key))
+                if value is None:
+                    missing.append(key)
+                else:
+                    self.lru.move_to_end((namespace, key))
+                    found[key] = value
+            stats['memory'] += len(found)
+            disk_hits = 0
+
+            for i in range(0, len(missing), _SQL_CHUNK):
+                chunk = missing[i:i + _SQL_CHUNK]
+                rows = self.conn.execute(
+                    f"SELECT key, value FROM rpc_results WHERE namespace = ? "
+                    f"AND key IN ({','.join('?' * len(chunk))})",
+                    [namespace, *chunk],
+                ).fetchall()
+                for key, raw in rows:
+                    value = json.loads(raw)
+                    self._remember(namespace, key, value)
+                    found[key] = value
+                    disk_hits += 1
+
+            stats['disk'] += disk_hits
+            stats['miss'] += len(missing) - disk_hits
+        return found
+
+    def get(self, namespace, key):
+        """Look up a single key; returns None when not cached"""
+        return self.get_many(namespace, [key]).get(key)
+
+    def put_many(self, namespace, items):
+        """Store {key: value} both in memory and on disk"""
+        if not items:
+            return
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO rpc_results (namespace, key, value) VALUES (?, ?, ?)",
+                [(namespace, key, json.dumps(value)) for key, value in items.items()],
+            )
+            self.conn.commit()
+            for key, value in items.items():
+                self._remember(namespace, key, value)
+
+    def put(self, namespace, key, value):
+        """Store a single value"""
+        self.put_many(namespace, {key: value})
+
+    def report(self):
+        """Print hit/miss counts per namespace"""
+        for namespace, stats in sorted(self.stats.items()):
+            hits = stats['memory'] + stats['disk']
+            lookups = hits + stats['miss']
+            rate = 100 * hits / lookups if lookups else 0
+            print(f"RPC cache [{namespace}]: {hits} hits ({stats['memory']} memory, {stats['disk']} disk), "
+                  f"{stats['miss']} misses ({rate:.1f}% hit rate)")
+
+    def close(self):
+        self.conn.close()
+
+
+def get_cache():
+    """Process-wide shared cache instance"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = RpcCache()
+        return _shared_cache
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+JSON-RPC client shared by the enrichment scripts
+
+Spreads requests over one or more weighted endpoints (RPC_URLS, falling back
+to RPC_URL), each with a keep-alive connection pool, a token-bucket rate
+limit and an AIMD concurrency limit: the number of requests in flight grows
+by one per window of fast responses and halves on 429s or slow responses.
+Throttled (429), 5xx and connection failures are retried with exponential
+backoff on the next available endpoint.
+"""
+
+import os
+import time
+import random
+import itertools
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+# JSON-RPC "method not found" error code
+METHOD_NOT_FOUND = -32601
+# Error codes providers use for rate limiting inside a 200 response
+RATE_LIMIT_CODES = {429, -32005, -32029}
+
+# Requests per second per endpoint (token refill rate) and burst size;
+# override per endpoint with "url|weight|rps" in RPC_URLS
+RPC_RATE_LIMIT = float(os.getenv('RPC_RATE_LIMIT', '25'))
+RPC_BURST = int(os.getenv('RPC_BURST', '10'))
+# Ceiling for the adaptive in-flight request limit per endpoint
+RPC_MAX_CONCURRENCY = int(os.getenv('RPC_MAX_CONCURRENCY', '16'))
+# Responses slower than this halve the endpoint's concurrency limit
+RPC_TARGET_LATENCY = float(os.getenv('RPC_TARGET_LATENCY', '2'))
+# Retries per request after a 429, 5xx or connection error
+RPC_MAX_RETRIES = int(os.getenv('RPC_MAX_RETRIES', '5'))
+# First retry delay; doubles on every further attempt
+RPC_BACKOFF_SECONDS = float(os.getenv('RPC_BACKOFF_SECONDS', '0.5'))
+RPC_TIMEOUT = float(os.getenv('RPC_TIMEOUT', '30'))
+
+
+class RpcError(Exception):
+    """Error object returned by the RPC node"""
+
+    def __init__(self, error):
+        self.code = error.get('code')
+        self.message = error.get('message', '')
+        super().__init__(f"RPC error {self.code}: {self.message}")
+
+    def is_method_not_found(self):
+        """True if the provider does not implement the requested method"""
+        message = self.message.lower()
+        return (
+            self.code == METHOD_NOT_FOUND
+            or 'not supported' in message
+            or 'does not exist' in message
+            or 'not available' in message
+        )
+
+    def is_rate_limited(self):
+        """True if the provider rejected the request for exceeding its quota"""
+        message = self.message.lower()
+        return self.code in RATE_LIMIT_CODES or 'rate limit' in message or 'too many requests' in message
+
+
+class Throttled(Exception):
+    """Transient endpoint failure worth retrying (429, 5xx, connection error)"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket; callers reserve tokens and sleep off any debt"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, tokens):
+        """Seconds until tokens would be available, without taking them"""
+        with self.lock:
+            self._refill()
+            return max(min(tokens, self.capacity) - self.tokens, 0) / self.rate
+
+    def reserve(self, tokens):
+        """
+        Take tokens now, going into debt if needed (a batch may cost more than
+        the bucket holds); returns the seconds to wait before using them
+        """
+        with self.lock:
+            self._refill()
+            self.tokens -= tokens
+            return max(-self.tokens, 0) / self.rate
+
+
+class Endpoint:
+    """One RPC URL with its session, rate limit and AIMD concurrency limit"""
+
+    def __init__(self, url, weight=1.0, rate=RPC_RATE_LIMIT, max_concurrency=RPC_MAX_CONCURRENCY):
+        self.url = url
+        self.weight = weight
+        self.bucket = TokenBucket(rate, max(RPC_BURST, 1))
+        self.max_concurrency = max_concurrency
+        self.limit = float(max(1, max_concurrency // 4))
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.last_decrease = 0.0
+        self.failures = 0               # consecutive retryable failures
+        self.slots = threading.Condition()
+        self.stats = {'requests': 0, 'throttled': 0, 'errors': 0, 'seconds': 0.0}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def wait_time(self, cost):
+        """Seconds before a request of this cost could start here"""
+        return max(self.cooldown_until - time.monotonic(), self.bucket.wait_time(cost))
+
+    def acquire(self):
+        with self.slots:
+            while self.in_flight >= int(self.limit):
+                self.slots.wait()
+            self.in_flight += 1
+
+    def release(self, latency, congested):
+        """Return a slot and adapt the limit: +1 per window of good responses, halve on congestion"""
+        with self.slots:
+            self.in_flight -= 1
+            self.stats['requests'] += 1
+            self.stats['seconds'] += latency
+            self.stats['throttled'] += congested
+            self.failures = self.failures + 1 if congested else 0
+            now = time.monotonic()
+            if congested or latency > RPC_TARGET_LATENCY:
+                # Decrease at most once per round trip, not once per in-flight response
+                if now - self.last_decrease > latency:
+                    self.limit = max(1.0, self.limit / 2)
+                    self.last_decrease = now
+            else:
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            self.slots.notify_all()
+
+    def cool_down(self, seconds):
+        self.cooldown_until = max(self.cooldown_until, time.monotonic() + seconds)
+
+    def post(self, payload, timeout, cost=1):
+        """POST one JSON-RPC payload; raises Throttled on retryable failures"""
+        self.acquire()
+        # Pace only after taking a slot, so requests queued behind the
+        # concurrency limit do not go out together once slots free up
+        time.sleep(max(self.cooldown_until - time.monotonic(), 0) + self.bucket.reserve(cost))
+        start = time.perf_counter()
+        congested = False
+        outcome = 'error'
+        try:
+            try:
+                response = self.session.post(self.url, json=payload, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                congested = True
+                raise Throttled(f"{type(e).__name__}: {e}")
+
+            if response.status_code == 429 or response.status_code >= 500:
+                congested = True
+                retry_after = response.headers.get('Retry-After')
+                raise Throttled(f"HTTP {response.status_code}",
+                                float(retry_after) if retry_after and retry_after.isdigit() else None)
+            response.raise_for_status()
+            data = response.json()
+
+            if isinstance(data, dict) and 'error' in data and RpcError(data['error']).is_rate_limited():
+                congested = True
+                raise Throttled(RpcError(data['error']).message)
+            outcome = 'ok'
+            return data
+        finally:
+            latency = time.perf_counter() - start
+            self.release(latency, congested)
+            # Batches here hold one method; label them by their first call
+            method = (payload[0] if isinstance(payload, list) else payload).get('method', 'unknown')
+            metrics.record_rpc(method, latency, cost, 'throttled' if congested else outcome)
+
+
+class RpcClient:
+    """JSON-RPC over weighted, rate-limited keep-alive endpoints"""
+
+    def __init__(self, endpoints, timeout=RPC_TIMEOUT, max_retries=RPC_MAX_RETRIES):
+        if isinstance(endpoints, str):
+            endpoints = [Endpoint(endpoints)]
+        self.endpoints = list(endpoints)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._ids = itertools.count(1)
+
+    def _payload(self, method, params):
+        return {'jsonrpc': '2.0', 'id': next(self._ids), 'method': method, 'params': params}
+
+    def _pick(self, cost, avoid=None):
+        """Weighted choice among endpoints that can take the request now, else the soonest one"""
+        candidates = [e for e in self.endpoints if e is not avoid] or self.endpoints
+        waits = {e: e.wait_time(cost) for e in candidates}
+        ready = [e for e in candidates if waits[e] == 0]
+        if ready:
+            return random.choices(ready, weights=[e.weight for e in ready])[0]
+        return min(candidates, key=lambda e: waits[e] / e.weight)
+
+    def _post(self, payload, cost=1):
+        """Send a payload with rate limiting and retries; returns the decoded response"""
+        endpoint = None
+        for attempt in range(self.max_retries + 1):
+            endpoint = self._pick(cost, avoid=endpoint)
+            try:
+                return endpoint.post(payload, self.timeout, cost)
+            except Throttled as e:
+                if attempt == self.max_retries:
+                    endpoint.stats['errors'] += 1
+                    raise RpcError({'message': f"{endpoint.url} failed after {attempt + 1} attempts: {e}"})
+                # The retry goes to another endpoint if one is free, else waits
+                # out the backoff; an endpoint failing across requests (down,
+                # or over quota) backs off further each time
+                backoff = RPC_BACKOFF_SECONDS * 2 ** min(max(attempt, endpoint.failures - 1), 8)
+                endpoint.cool_down(e.retry_after or backoff * random.uniform(0.5, 1.5))
+
+    def call(self, method, params):
+        """Send a single request and return its result"""
+        data = self._post(self._payload(method, params))
+        if 'error' in data:
+            raise RpcError(data['error'])
+        return data.get('result')
+
+    def batch(self, calls):
+        """
+        Send [(method, params), ...] as one JSON-RPC batch.
+        Returns results in call order; failed entries are RpcError instances.
+        """
+        if not calls:
+            return []
+
+        payloads = [self._payload(method, params) for method, params in calls]
+        # Providers meter every call in a batch
+        data = self._post(payloads, cost=len(payloads))
+
+        # Some providers answer a rejected batch with a single error object
+        if isinstance(data, dict):
+            raise RpcError(data.get('error', {'message': str(data)}))
+
+        by_id = {item.get('id'): item for item in data}
+        results = []
+        for payload in payloads:
+            item = by_id.get(payload['id'])
+            if item is None:
+                results.append(RpcError({'message': 'missing response in batch'}))
+            elif 'error' in item:
+                results.append(RpcError(item['error']))
+            else:
+                results.append(item.get('result'))
+        return results
+
+    def report(self):
+        """Print per-endpoint request, throttle and latency counters"""
+        for endpoint in self.endpoints:
+            stats = endpoint.stats
+            if not stats['requests']:
+                continue
+            print(f"RPC {endpoint.url}: {stats['requests']} requests, {stats['throttled']} throttled, "
+                  f"{stats['errors']} failed, {1000 * stats['seconds'] / stats['requests']:.0f} ms avg, "
+                  f"concurrency limit {int(endpoint.limit)}")
+
+    def close(self):
+        for endpoint in self.endpoints:
+            endpoint.session.close()
+
+
+def parse_endpoints(spec, share=1):
+    """
+    Parse "url[|weight[|rps]],..." into Endpoints, skipping unconfigured
+    placeholders; each gets 1/share of its rate limit
+    """
+    endpoints = []
+    for entry in spec.split(','):
+        parts = entry.strip().split('|')
+        url = parts[0].strip()
+        if not url or '<YOUR_ALCHEMY_KEY>' in url:
+            continue
+        weight = float(parts[1]) if len(parts) > 1 and parts[1].strip() else 1.0
+        rate = float(parts[2]) if len(parts) > 2 and parts[2].strip() else RPC_RATE_LIMIT
+        endpoints.append(Endpoint(url, weight, rate / share))
+    return endpoints
+
+
+def connect_rpc(share=1):
+    """
+    Create a JSON-RPC client from RPC_URLS (or RPC_URL); processes that run
+    side by side pass share=<process count> to split the rate limits
+    """
+    endpoints = parse_endpoints(os.getenv('RPC_URLS') or os.getenv('RPC_URL') or '', share)
+    if not endpoints:
+        print("Warning: No valid RPC URL configured")
+        return None
+    return RpcClient(endpoints)
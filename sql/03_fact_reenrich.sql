@@ -0,0 +1,4 @@
+-- Re-enrich facts whose gas, address labels or prices arrived after they were loaded
+-- (see labs_solo.reenrich_swap_facts in sql/ddl/02_fact_load.sql)
+
+SELECT * FROM labs_solo.reenrich_swap_facts();
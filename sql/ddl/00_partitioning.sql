@@ -0,0 +1,59 @@
+-- Monthly range partitioning helpers for the swap tables
+-- raw_unichain_swaps and labs_solo.pool_swap_fact_unichain_base are
+-- partitioned by month on block_time (see 01_tables.sql). Partitions are named
+-- <table>_yYYYYmMM; a <table>_default partition catches anything outside them.
+
+-- Create the monthly partitions of p_schema.p_table from p_from's month up to
+-- p_months_ahead months past the current one. Rows already sitting in the
+-- default partition for a month being created are moved into it.
+-- Returns the number of partitions created.
+CREATE OR REPLACE FUNCTION ensure_monthly_partitions(
+    p_schema TEXT,
+    p_table TEXT,
+    p_from DATE DEFAULT NULL,
+    p_months_ahead INTEGER DEFAULT 3
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_default TEXT := p_table || '_default';
+    v_month DATE;
+    v_last DATE := (date_trunc('month', NOW()) + make_interval(months => p_months_ahead))::date;
+    v_default_min TIMESTAMP;
+    v_partition TEXT;
+    v_created INTEGER := 0;
+BEGIN
+    IF to_regclass(format('%I.%I', p_schema, v_default)) IS NOT NULL THEN
+        EXECUTE format('SELECT MIN(block_time) FROM %I.%I', p_schema, v_default) INTO v_default_min;
+    END IF;
+
+    v_month := date_trunc('month', LEAST(COALESCE(p_from, NOW()), COALESCE(v_default_min, NOW())))::date;
+
+    WHILE v_month <= v_last LOOP
+        v_partition := format('%s_y%sm%s', p_table, to_char(v_month, 'YYYY'), to_char(v_month, 'MM'));
+
+        IF to_regclass(format('%I.%I', p_schema, v_partition)) IS NULL THEN
+            -- Build the partition standalone, move matching default rows in,
+            -- then attach; attaching alongside conflicting default rows fails
+            EXECUTE format('CREATE TABLE %I.%I (LIKE %I.%I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                           p_schema, v_partition, p_schema, p_table);
+            IF v_default_min IS NOT NULL THEN
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM %I.%I WHERE block_time >= %L AND block_time < %L RETURNING *) '
+                    'INSERT INTO %I.%I SELECT * FROM moved',
+                    p_schema, v_default, v_month, (v_month + INTERVAL '1 month')::date,
+                    p_schema, v_partition);
+            END IF;
+            EXECUTE format('ALTER TABLE %I.%I ATTACH PARTITION %I.%I FOR VALUES FROM (%L) TO (%L)',
+                           p_schema, p_table, p_schema, v_partition,
+                           v_month, (v_month + INTERVAL '1 month')::date);
+            v_created := v_created + 1;
+        END IF;
+
+        v_month := (v_month + INTERVAL '1 month')::date;
+    END LOOP;
+
+    RETURN v_created;
+END;
+$$;
@@ -15,8 +15,12 @@ CREATE TABLE IF NOT EXISTS raw_unichain_swaps (
     sender BYTEA NOT NULL,    -- msg.sender (trader or contract)
     origin BYTEA,             -- tx.origin (EOA)
     created_at TIMESTAMP DEFAULT NOW(),
-    PRIMARY KEY (tx_hash, log_index)
-);
+    PRIMARY KEY (tx_hash, log_index, block_time)   -- partition key must be part of the key
+) PARTITION BY RANGE (block_time);
+
+-- Monthly partitions from the UniChain mainnet launch, plus a catch-all
+CREATE TABLE IF NOT EXISTS raw_unichain_swaps_default PARTITION OF raw_unichain_swaps DEFAULT;
+SELECT ensure_monthly_partitions('public', 'raw_unichain_swaps', '2025-02-01');
 
 -- Transaction gas usage data
 CREATE TABLE IF NOT EXISTS tx_gas (
@@ -32,6 +36,28 @@ CREATE TABLE IF NOT EXISTS address_labels (
     label VARCHAR(255),
     flow_source VARCHAR(100) DEFAULT 'Other',
     is_contract BOOLEAN DEFAULT FALSE,
+    code_checked_at TIMESTAMP,      -- last eth_getCode lookup (NULL = never checked)
+    code_checked_block BIGINT,      -- block the lookup was made against
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Columns added after the initial release
+ALTER TABLE address_labels ADD COLUMN IF NOT EXISTS code_checked_at TIMESTAMP;
+ALTER TABLE address_labels ADD COLUMN IF NOT EXISTS code_checked_block BIGINT;
+
+-- Registry of the pools the pipeline enriches, loads and validates
+-- Token decimals come from the tokens table (sql/ddl/03_prices.sql).
+CREATE TABLE IF NOT EXISTS pools (
+    pool_address BYTEA PRIMARY KEY,   -- v4 pool id (32 bytes)
+    label VARCHAR(100),
+    is_hooked BOOLEAN NOT NULL DEFAULT FALSE,
+    hooks BYTEA,                      -- hook contract (NULL for static pools)
+    token0 BYTEA,
+    token1 BYTEA,
+    fee INTEGER,                      -- hundredths of a bip
+    start_block BIGINT NOT NULL DEFAULT 0,   -- swaps before this block are ignored
+    enabled BOOLEAN NOT NULL DEFAULT TRUE,
     created_at TIMESTAMP DEFAULT NOW(),
     updated_at TIMESTAMP DEFAULT NOW()
 );
@@ -39,31 +65,139 @@ CREATE TABLE IF NOT EXISTS address_labels (
 -- Schema for the final fact table
 CREATE SCHEMA IF NOT EXISTS labs_solo;
 
--- Final enriched swap facts table
-CREATE TABLE IF NOT EXISTS labs_solo.pool_swap_fact_unichain (
+-- Dimensions of the fact table: each distinct pool, token, trader and
+-- flow_source is stored once and referenced from the facts by a small key
+CREATE TABLE IF NOT EXISTS labs_solo.dim_pool (
+    pool_id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    pool_address BYTEA NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS labs_solo.dim_token (
+    token_id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    token_address BYTEA NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS labs_solo.dim_trader (
+    trader_id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    address BYTEA NOT NULL UNIQUE   -- msg.sender; labels stay in address_labels
+);
+
+-- Fixed ids for the built-in sources ('Other' = 1 is the fact default and
+-- the idx_fact_unlabeled predicate); address_labels may add more
+CREATE TABLE IF NOT EXISTS labs_solo.dim_flow_source (
+    flow_source_id SMALLINT GENERATED BY DEFAULT AS IDENTITY (START WITH 16) PRIMARY KEY,
+    flow_source VARCHAR(100) NOT NULL UNIQUE
+);
+
+INSERT INTO labs_solo.dim_flow_source (flow_source_id, flow_source)
+VALUES (1, 'Other'), (2, 'EOA'), (3, 'Contract')
+ON CONFLICT DO NOTHING;
+
+-- Final enriched swap facts, keyed by the dimensions above. Columns are
+-- ordered widest fixed-size first so rows carry no alignment padding.
+-- Read them through the labs_solo.pool_swap_fact_unichain view below.
+CREATE TABLE IF NOT EXISTS labs_solo.pool_swap_fact_unichain_base (
     block_time TIMESTAMP NOT NULL,
-    tx_hash BYTEA NOT NULL,
+    gas_used BIGINT,
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW(),   -- last change to an exported column (delta export watermark)
+    -- Derived at load time (labs_solo.load_swap_facts): amounts in token
+    -- units (NULL while the token's decimals are unknown), USD volume of the
+    -- priced leg, and the tx's gas cost (per tx, repeated on each hop)
+    amount0_norm DOUBLE PRECISION,
+    amount1_norm DOUBLE PRECISION,
+    volume_usd DOUBLE PRECISION NOT NULL DEFAULT 0,
+    gas_cost_eth DOUBLE PRECISION,
+    gas_cost_usd DOUBLE PRECISION,
     log_index INTEGER NOT NULL,
-    pool_address BYTEA NOT NULL,
-    token0 BYTEA NOT NULL,
-    token1 BYTEA NOT NULL,
+    pool_id INTEGER NOT NULL,
+    token0_id INTEGER NOT NULL,
+    token1_id INTEGER NOT NULL,
+    trader_id INTEGER NOT NULL,
+    hop_index INTEGER DEFAULT 1,
+    flow_source_id SMALLINT NOT NULL DEFAULT 1,   -- 'Other'
+    is_contract BOOLEAN DEFAULT FALSE,
+    tx_hash BYTEA NOT NULL,
     amount0 NUMERIC NOT NULL,
     amount1 NUMERIC NOT NULL,
     price0_usd NUMERIC DEFAULT 0,
     price1_usd NUMERIC DEFAULT 0,
-    trader BYTEA NOT NULL,
-    is_contract BOOLEAN DEFAULT FALSE,
-    flow_source VARCHAR(100) DEFAULT 'Other',
-    hop_index INTEGER DEFAULT 1,
-    gas_used BIGINT,
-    created_at TIMESTAMP DEFAULT NOW(),
-    PRIMARY KEY (tx_hash, log_index)
+    PRIMARY KEY (tx_hash, log_index, block_time)
+) PARTITION BY RANGE (block_time);
+
+CREATE TABLE IF NOT EXISTS labs_solo.pool_swap_fact_unichain_base_default PARTITION OF labs_solo.pool_swap_fact_unichain_base DEFAULT;
+SELECT ensure_monthly_partitions('labs_solo', 'pool_swap_fact_unichain_base', '2025-02-01');
+
+-- Columns added after the initial release; backfill them with
+-- labs_solo.recompute_fact_amounts() (sql/ddl/02_fact_load.sql)
+ALTER TABLE labs_solo.pool_swap_fact_unichain_base ADD COLUMN IF NOT EXISTS amount0_norm DOUBLE PRECISION;
+ALTER TABLE labs_solo.pool_swap_fact_unichain_base ADD COLUMN IF NOT EXISTS amount1_norm DOUBLE PRECISION;
+ALTER TABLE labs_solo.pool_swap_fact_unichain_base ADD COLUMN IF NOT EXISTS volume_usd DOUBLE PRECISION NOT NULL DEFAULT 0;
+ALTER TABLE labs_solo.pool_swap_fact_unichain_base ADD COLUMN IF NOT EXISTS gas_cost_eth DOUBLE PRECISION;
+ALTER TABLE labs_solo.pool_swap_fact_unichain_base ADD COLUMN IF NOT EXISTS gas_cost_usd DOUBLE PRECISION;
+
+-- The facts with readable addresses and flow_source, in the original column
+-- layout, for Hasura and the CSV/Parquet exports. LEFT JOINs on the unique
+-- dimension keys let the planner drop the dimensions a query does not read.
+CREATE OR REPLACE VIEW labs_solo.pool_swap_fact_unichain AS
+SELECT
+    f.block_time,
+    f.tx_hash,
+    f.log_index,
+    p.pool_address,
+    t0.token_address AS token0,
+    t1.token_address AS token1,
+    f.amount0,
+    f.amount1,
+    f.price0_usd,
+    f.price1_usd,
+    tr.address AS trader,
+    f.is_contract,
+    fs.flow_source,
+    f.hop_index,
+    f.gas_used,
+    f.created_at,
+    f.updated_at,
+    f.amount0_norm,
+    f.amount1_norm,
+    f.volume_usd,
+    f.gas_cost_eth,
+    f.gas_cost_usd
+FROM labs_solo.pool_swap_fact_unichain_base f
+LEFT JOIN labs_solo.dim_pool p ON p.pool_id = f.pool_id
+LEFT JOIN labs_solo.dim_token t0 ON t0.token_id = f.token0_id
+LEFT JOIN labs_solo.dim_token t1 ON t1.token_id = f.token1_id
+LEFT JOIN labs_solo.dim_trader tr ON tr.trader_id = f.trader_id
+LEFT JOIN labs_solo.dim_flow_source fs ON fs.flow_source_id = f.flow_source_id;
+
+-- Incremental fact load checkpoint: last raw block loaded per pool
+CREATE TABLE IF NOT EXISTS labs_solo.fact_load_watermark (
+    pool_address BYTEA PRIMARY KEY,
+    last_block_number BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT NOW()
 );
 
--- Indexes for performance
+-- Indexes for performance (created on every partition)
+-- Rows arrive in block_time order, so BRIN indexes on time stay tiny and
+-- combine with partition pruning for date-bounded scans
 CREATE INDEX IF NOT EXISTS idx_raw_swaps_pool_time ON raw_unichain_swaps (pool_address, block_time);
-CREATE INDEX IF NOT EXISTS idx_raw_swaps_time ON raw_unichain_swaps (block_time);
+CREATE INDEX IF NOT EXISTS idx_raw_swaps_time_brin ON raw_unichain_swaps USING brin (block_time);
 CREATE INDEX IF NOT EXISTS idx_raw_swaps_sender ON raw_unichain_swaps (sender);
-CREATE INDEX IF NOT EXISTS idx_fact_time ON labs_solo.pool_swap_fact_unichain (block_time);
-CREATE INDEX IF NOT EXISTS idx_fact_pool ON labs_solo.pool_swap_fact_unichain (pool_address);
-CREATE INDEX IF NOT EXISTS idx_fact_trader ON labs_solo.pool_swap_fact_unichain (trader); 
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_raw_swaps_pool_block ON raw_unichain_swaps (pool_address, block_number);
+CREATE INDEX IF NOT EXISTS idx_raw_swaps_block ON raw_unichain_swaps (block_number);
+CREATE INDEX IF NOT EXISTS idx_fact_time_brin ON labs_solo.pool_swap_fact_unichain_base USING brin (block_time);
+CREATE INDEX IF NOT EXISTS idx_fact_pool ON labs_solo.pool_swap_fact_unichain_base (pool_id);
+CREATE INDEX IF NOT EXISTS idx_fact_trader ON labs_solo.pool_swap_fact_unichain_base (trader_id);
+-- Largest swaps first, for top-N queries
+CREATE INDEX IF NOT EXISTS idx_fact_volume ON labs_solo.pool_swap_fact_unichain_base (volume_usd DESC);
+-- New row versions are written in updated_at order, so delta exports
+-- (scripts/export_delta.py) scan a few block ranges instead of the table
+CREATE INDEX IF NOT EXISTS idx_fact_updated_brin ON labs_solo.pool_swap_fact_unichain_base USING brin (updated_at);
+
+-- Small partial indexes over facts still waiting for late gas, labels or prices
+CREATE INDEX IF NOT EXISTS idx_fact_missing_gas ON labs_solo.pool_swap_fact_unichain_base (tx_hash) WHERE gas_used IS NULL;
+CREATE INDEX IF NOT EXISTS idx_fact_unlabeled ON labs_solo.pool_swap_fact_unichain_base (trader_id) WHERE flow_source_id = 1;
+CREATE INDEX IF NOT EXISTS idx_fact_unpriced0 ON labs_solo.pool_swap_fact_unichain_base (token0_id, block_time) WHERE price0_usd = 0;
+CREATE INDEX IF NOT EXISTS idx_fact_unpriced1 ON labs_solo.pool_swap_fact_unichain_base (token1_id, block_time) WHERE price1_usd = 0;
+CREATE INDEX IF NOT EXISTS idx_fact_unpriced_gas ON labs_solo.pool_swap_fact_unichain_base (block_time)
+    WHERE gas_cost_usd IS NULL AND gas_cost_eth IS NOT NULL;
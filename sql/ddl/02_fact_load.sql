@@ -0,0 +1,367 @@
+-- Incremental fact loading and late re-enrichment
+-- Called from sql/02_fact_insert.sql and sql/03_fact_reenrich.sql
+
+-- USD volume of a swap from whichever leg is priced, in token units
+CREATE OR REPLACE FUNCTION labs_solo.swap_volume_usd(
+    p_amount0_norm DOUBLE PRECISION, p_amount1_norm DOUBLE PRECISION,
+    p_price0 NUMERIC, p_price1 NUMERIC
+)
+RETURNS DOUBLE PRECISION
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT CASE
+        WHEN p_price0 > 0 AND p_amount0_norm IS NOT NULL THEN ABS(p_amount0_norm) * p_price0::DOUBLE PRECISION
+        WHEN p_price1 > 0 AND p_amount1_norm IS NOT NULL THEN ABS(p_amount1_norm) * p_price1::DOUBLE PRECISION
+        ELSE 0
+    END;
+$$;
+
+-- Load new raw swaps of the enabled pools in the pools registry into the fact
+-- table, starting from each pool's watermark (or its start_block).
+-- The watermark block itself is re-read so rows the indexer wrote late for that
+-- block are not missed; ON CONFLICT skips the ones already loaded.
+-- Pass p_full_reload => TRUE to ignore the watermarks and rescan all history,
+-- and p_pool to load a single pool: shards for different pools run in
+-- parallel, while an all-pools load waits for them and excludes them.
+-- p_from_block/p_to_block load just that block range (scripts/backfill.py):
+-- the watermarks are neither read nor advanced, and ranges run in parallel.
+DROP FUNCTION IF EXISTS labs_solo.load_swap_facts(BOOLEAN);
+DROP FUNCTION IF EXISTS labs_solo.load_swap_facts(BOOLEAN, BYTEA);
+CREATE OR REPLACE FUNCTION labs_solo.load_swap_facts(
+    p_full_reload BOOLEAN DEFAULT FALSE,
+    p_pool BYTEA DEFAULT NULL,
+    p_from_block BIGINT DEFAULT NULL,
+    p_to_block BIGINT DEFAULT NULL
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_lock INTEGER := hashtext('labs_solo.load_swap_facts');
+    v_rows INTEGER;
+BEGIN
+    -- The daily pipeline and the refresher daemon both load facts; loads of
+    -- the same pool (or of all pools) run one at a time so they never race
+    -- on a watermark
+    IF p_pool IS NULL AND p_to_block IS NULL THEN
+        PERFORM pg_advisory_xact_lock(v_lock);
+    ELSIF p_pool IS NULL THEN
+        PERFORM pg_advisory_xact_lock_shared(v_lock);
+    ELSE
+        PERFORM pg_advisory_xact_lock_shared(v_lock);
+        PERFORM pg_advisory_xact_lock(v_lock, hashtext(encode(p_pool, 'hex')));
+    END IF;
+
+    -- New swaps per pool past its watermark, or the swaps of the block range
+    CREATE TEMP TABLE fact_load_batch ON COMMIT DROP AS
+    SELECT s.pool_address, s.tx_hash, s.block_number
+    FROM pools p
+    LEFT JOIN labs_solo.fact_load_watermark w ON w.pool_address = p.pool_address
+    JOIN raw_unichain_swaps s
+        ON s.pool_address = p.pool_address
+        AND s.block_number >= GREATEST(
+            p.start_block,
+            CASE
+                WHEN p_to_block IS NOT NULL THEN COALESCE(p_from_block, 0)
+                WHEN p_full_reload THEN 0
+                ELSE COALESCE(w.last_block_number, 0)
+            END
+        )
+        AND (p_to_block IS NULL OR s.block_number <= p_to_block)
+    WHERE p.enabled
+      AND (p_pool IS NULL OR p.pool_address = p_pool);
+
+    -- Number hops over every registered-pool swap of the affected txs,
+    -- including hops loaded by earlier runs, so txs straddling the boundary
+    -- (or spanning pools loaded by other shards) stay correct
+    CREATE TEMP TABLE fact_load_rows ON COMMIT DROP AS
+    WITH batch_txs AS (
+        SELECT DISTINCT tx_hash FROM fact_load_batch
+    )
+    SELECT
+        s.*,
+        ROW_NUMBER() OVER (PARTITION BY s.tx_hash ORDER BY s.log_index) AS hop_index
+    FROM raw_unichain_swaps s
+    JOIN batch_txs b ON b.tx_hash = s.tx_hash
+    JOIN pools p ON p.pool_address = s.pool_address
+    WHERE p.enabled
+      AND s.block_number >= p.start_block;
+
+    -- Keys for pools, tokens, traders and flow sources seen for the first
+    -- time; sorted so concurrent shards lock new keys in the same order
+    INSERT INTO labs_solo.dim_pool (pool_address)
+    SELECT DISTINCT pool_address
+    FROM fact_load_rows r
+    WHERE NOT EXISTS (SELECT 1 FROM labs_solo.dim_pool d WHERE d.pool_address = r.pool_address)
+    ORDER BY pool_address
+    ON CONFLICT (pool_address) DO NOTHING;
+
+    INSERT INTO labs_solo.dim_token (token_address)
+    SELECT token_address
+    FROM (SELECT token0 AS token_address FROM fact_load_rows
+          UNION
+          SELECT token1 FROM fact_load_rows) r
+    WHERE NOT EXISTS (SELECT 1 FROM labs_solo.dim_token d WHERE d.token_address = r.token_address)
+    ORDER BY token_address
+    ON CONFLICT (token_address) DO NOTHING;
+
+    INSERT INTO labs_solo.dim_trader (address)
+    SELECT DISTINCT sender
+    FROM fact_load_rows r
+    WHERE NOT EXISTS (SELECT 1 FROM labs_solo.dim_trader d WHERE d.address = r.sender)
+    ORDER BY sender
+    ON CONFLICT (address) DO NOTHING;
+
+    INSERT INTO labs_solo.dim_flow_source (flow_source)
+    SELECT DISTINCT l.flow_source
+    FROM fact_load_rows r
+    JOIN address_labels l ON l.address = r.sender
+    WHERE l.flow_source IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM labs_solo.dim_flow_source d WHERE d.flow_source = l.flow_source)
+    ORDER BY l.flow_source
+    ON CONFLICT (flow_source) DO NOTHING;
+
+    INSERT INTO labs_solo.pool_swap_fact_unichain_base (
+        block_time,
+        tx_hash,
+        log_index,
+        pool_id,
+        token0_id,
+        token1_id,
+        amount0,
+        amount1,
+        price0_usd,
+        price1_usd,
+        trader_id,
+        is_contract,
+        flow_source_id,
+        hop_index,
+        gas_used,
+        amount0_norm,
+        amount1_norm,
+        volume_usd,
+        gas_cost_eth,
+        gas_cost_usd
+    )
+    SELECT
+        s.block_time,
+        s.tx_hash,
+        s.log_index,
+        dp.pool_id,
+        t0.token_id as token0_id,
+        t1.token_id as token1_id,
+        s.amount0,
+        s.amount1,
+        COALESCE(p0.price_usd, 0) as price0_usd,
+        COALESCE(p1.price_usd, 0) as price1_usd,
+        tr.trader_id,
+        COALESCE(l.is_contract, FALSE) as is_contract,
+        fs.flow_source_id,
+        s.hop_index,
+        g.gas_used,
+        n.amount0_norm,
+        n.amount1_norm,
+        labs_solo.swap_volume_usd(n.amount0_norm, n.amount1_norm, p0.price_usd, p1.price_usd) as volume_usd,
+        n.gas_cost_eth,
+        n.gas_cost_eth * e.price_usd::DOUBLE PRECISION as gas_cost_usd
+    FROM fact_load_rows s
+    -- Surrogate keys
+    JOIN labs_solo.dim_pool dp ON dp.pool_address = s.pool_address
+    JOIN labs_solo.dim_token t0 ON t0.token_address = s.token0
+    JOIN labs_solo.dim_token t1 ON t1.token_address = s.token1
+    JOIN labs_solo.dim_trader tr ON tr.address = s.sender
+    -- Join with gas data
+    LEFT JOIN tx_gas g ON s.tx_hash = g.tx_hash
+    -- Join with token0 prices
+    LEFT JOIN token_prices_usd_day p0 ON s.token0 = p0.token_address
+        AND DATE(s.block_time) = p0.price_date
+    -- Join with token1 prices
+    LEFT JOIN token_prices_usd_day p1 ON s.token1 = p1.token_address
+        AND DATE(s.block_time) = p1.price_date
+    -- Join with address labels
+    LEFT JOIN address_labels l ON s.sender = l.address
+    JOIN labs_solo.dim_flow_source fs ON fs.flow_source = COALESCE(l.flow_source, 'Other')
+    -- Token decimals and the day's ETH price for the derived columns
+    LEFT JOIN tokens d0 ON d0.token_address = s.token0
+    LEFT JOIN tokens d1 ON d1.token_address = s.token1
+    LEFT JOIN eth_prices_usd_day e ON e.price_date = DATE(s.block_time)
+    CROSS JOIN LATERAL (
+        SELECT
+            s.amount0::DOUBLE PRECISION / 10::DOUBLE PRECISION ^ d0.decimals AS amount0_norm,
+            s.amount1::DOUBLE PRECISION / 10::DOUBLE PRECISION ^ d1.decimals AS amount1_norm,
+            g.gas_used::DOUBLE PRECISION * g.gas_price / 1e18 AS gas_cost_eth
+    ) n
+    -- Key order keeps concurrent shards touching a shared tx from deadlocking
+    ORDER BY s.tx_hash, s.log_index
+    -- Existing rows only change if a late hop shifted their position
+    ON CONFLICT (tx_hash, log_index, block_time) DO UPDATE SET
+        hop_index = EXCLUDED.hop_index,
+        updated_at = NOW()
+    WHERE pool_swap_fact_unichain_base.hop_index IS DISTINCT FROM EXCLUDED.hop_index;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+    -- Advance the watermarks to the last block seen per pool
+    INSERT INTO labs_solo.fact_load_watermark (pool_address, last_block_number, updated_at)
+    SELECT pool_address, MAX(block_number), NOW()
+    FROM fact_load_batch
+    WHERE p_to_block IS NULL
+    GROUP BY pool_address
+    ON CONFLICT (pool_address) DO UPDATE SET
+        last_block_number = GREATEST(fact_load_watermark.last_block_number, EXCLUDED.last_block_number),
+        updated_at = NOW();
+
+    DROP TABLE fact_load_rows;
+    DROP TABLE fact_load_batch;
+    RETURN v_rows;
+END;
+$$;
+
+-- Fill in gas, labels and prices that arrived after a fact row was loaded.
+-- Only rows still waiting (NULL gas, no USD gas cost, 'Other' label, zero
+-- price) are visited, through the partial indexes idx_fact_missing_gas,
+-- idx_fact_unpriced_gas, idx_fact_unlabeled and idx_fact_unpriced0/1.
+-- Filling in a price also recomputes the row's volume_usd.
+DROP FUNCTION IF EXISTS labs_solo.reenrich_swap_facts();
+CREATE OR REPLACE FUNCTION labs_solo.reenrich_swap_facts()
+RETURNS TABLE (gas_updated INTEGER, labels_updated INTEGER, prices_updated INTEGER)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    UPDATE labs_solo.pool_swap_fact_unichain_base f
+    SET gas_used = g.gas_used,
+        gas_cost_eth = g.gas_used::DOUBLE PRECISION * g.gas_price / 1e18,
+        updated_at = NOW()
+    FROM tx_gas g
+    WHERE f.gas_used IS NULL
+      AND g.tx_hash = f.tx_hash;
+
+    GET DIAGNOSTICS gas_updated = ROW_COUNT;
+
+    -- Gas costs in USD once the day's ETH price is known; not an exported
+    -- column, so updated_at (the delta export watermark) is left alone
+    UPDATE labs_solo.pool_swap_fact_unichain_base f
+    SET gas_cost_usd = f.gas_cost_eth * e.price_usd::DOUBLE PRECISION
+    FROM eth_prices_usd_day e
+    WHERE f.gas_cost_usd IS NULL
+      AND f.gas_cost_eth IS NOT NULL
+      AND e.price_date = DATE(f.block_time)
+      AND e.price_usd IS NOT NULL;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    gas_updated := gas_updated + v_rows;
+
+    -- Flow sources labelled since the facts were loaded
+    INSERT INTO labs_solo.dim_flow_source (flow_source)
+    SELECT DISTINCT l.flow_source
+    FROM address_labels l
+    WHERE l.flow_source IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM labs_solo.dim_flow_source d WHERE d.flow_source = l.flow_source)
+    ORDER BY l.flow_source
+    ON CONFLICT (flow_source) DO NOTHING;
+
+    UPDATE labs_solo.pool_swap_fact_unichain_base f
+    SET is_contract = COALESCE(l.is_contract, FALSE),
+        flow_source_id = fs.flow_source_id,
+        updated_at = NOW()
+    FROM address_labels l
+    JOIN labs_solo.dim_trader tr ON tr.address = l.address
+    JOIN labs_solo.dim_flow_source fs ON fs.flow_source = COALESCE(l.flow_source, 'Other')
+    WHERE f.flow_source_id = 1   -- 'Other'
+      AND tr.trader_id = f.trader_id
+      AND (
+          fs.flow_source_id <> 1
+          OR COALESCE(l.is_contract, FALSE) <> f.is_contract
+      );
+
+    GET DIAGNOSTICS labels_updated = ROW_COUNT;
+
+    UPDATE labs_solo.pool_swap_fact_unichain_base f
+    SET price0_usd = p.price_usd,
+        volume_usd = labs_solo.swap_volume_usd(f.amount0_norm, f.amount1_norm, p.price_usd, f.price1_usd),
+        updated_at = NOW()
+    FROM token_prices_usd_day p
+    JOIN labs_solo.dim_token t ON t.token_address = p.token_address
+    WHERE f.price0_usd = 0
+      AND t.token_id = f.token0_id
+      AND p.price_date = DATE(f.block_time)
+      AND p.price_usd <> 0;
+
+    GET DIAGNOSTICS prices_updated = ROW_COUNT;
+
+    UPDATE labs_solo.pool_swap_fact_unichain_base f
+    SET price1_usd = p.price_usd,
+        volume_usd = labs_solo.swap_volume_usd(f.amount0_norm, f.amount1_norm, f.price0_usd, p.price_usd),
+        updated_at = NOW()
+    FROM token_prices_usd_day p
+    JOIN labs_solo.dim_token t ON t.token_address = p.token_address
+    WHERE f.price1_usd = 0
+      AND t.token_id = f.token1_id
+      AND p.price_date = DATE(f.block_time)
+      AND p.price_usd <> 0;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    prices_updated := prices_updated + v_rows;
+
+    RETURN NEXT;
+END;
+$$;
+
+-- Recompute the derived columns (amount0/1_norm, volume_usd, gas_cost_eth/usd)
+-- of facts at or after p_from (all history when NULL) from the current token
+-- decimals, prices and gas prices, e.g. after adding or correcting a token's
+-- decimals or to backfill facts loaded before the columns existed. Only rows
+-- whose values change are written; the rollup triggers follow them. None of
+-- these columns are in the CSV exports, so updated_at is not touched and the
+-- rows do not reappear in delta exports.
+-- Returns the rows updated.
+CREATE OR REPLACE FUNCTION labs_solo.recompute_fact_amounts(p_from TIMESTAMP DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    UPDATE labs_solo.pool_swap_fact_unichain_base f
+    SET amount0_norm = c.amount0_norm,
+        amount1_norm = c.amount1_norm,
+        volume_usd = labs_solo.swap_volume_usd(c.amount0_norm, c.amount1_norm, f.price0_usd, f.price1_usd),
+        gas_cost_eth = c.gas_cost_eth,
+        gas_cost_usd = c.gas_cost_eth * c.eth_price_usd::DOUBLE PRECISION
+    FROM (
+        SELECT
+            x.tx_hash,
+            x.log_index,
+            x.block_time,
+            x.amount0::DOUBLE PRECISION / 10::DOUBLE PRECISION ^ d0.decimals AS amount0_norm,
+            x.amount1::DOUBLE PRECISION / 10::DOUBLE PRECISION ^ d1.decimals AS amount1_norm,
+            x.gas_used::DOUBLE PRECISION * g.gas_price / 1e18 AS gas_cost_eth,
+            e.price_usd AS eth_price_usd
+        FROM labs_solo.pool_swap_fact_unichain_base x
+        JOIN labs_solo.dim_token t0 ON t0.token_id = x.token0_id
+        JOIN labs_solo.dim_token t1 ON t1.token_id = x.token1_id
+        LEFT JOIN tokens d0 ON d0.token_address = t0.token_address
+        LEFT JOIN tokens d1 ON d1.token_address = t1.token_address
+        LEFT JOIN tx_gas g ON g.tx_hash = x.tx_hash
+        LEFT JOIN eth_prices_usd_day e ON e.price_date = DATE(x.block_time)
+        WHERE x.block_time >= COALESCE(p_from, '-infinity')
+    ) c
+    WHERE f.tx_hash = c.tx_hash
+      AND f.log_index = c.log_index
+      AND f.block_time = c.block_time
+      AND f.block_time >= COALESCE(p_from, '-infinity')
+      AND (
+          f.amount0_norm IS DISTINCT FROM c.amount0_norm
+          OR f.amount1_norm IS DISTINCT FROM c.amount1_norm
+          OR f.volume_usd IS DISTINCT FROM labs_solo.swap_volume_usd(c.amount0_norm, c.amount1_norm, f.price0_usd, f.price1_usd)
+          OR f.gas_cost_eth IS DISTINCT FROM c.gas_cost_eth
+          OR f.gas_cost_usd IS DISTINCT FROM c.gas_cost_eth * c.eth_price_usd::DOUBLE PRECISION
+      );
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$;
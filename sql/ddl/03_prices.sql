@@ -0,0 +1,208 @@
+-- Swap-derived token USD prices
+-- Daily and hourly VWAP prices computed from raw_unichain_swaps against legs
+-- with a known USD price (stablecoins, external anchors, or tokens priced in
+-- an earlier pass). Results are upserted, so readers are never blocked.
+
+-- Replace the placeholder materialized view from earlier releases
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_matviews WHERE matviewname = 'token_prices_usd_day') THEN
+        DROP MATERIALIZED VIEW token_prices_usd_day;
+    END IF;
+END;
+$$;
+
+-- Token metadata needed to turn raw amounts into quantities
+CREATE TABLE IF NOT EXISTS tokens (
+    token_address BYTEA PRIMARY KEY,
+    symbol VARCHAR(32),
+    decimals SMALLINT NOT NULL,
+    is_stable BOOLEAN DEFAULT FALSE,   -- priced at 1 USD, anchors the price graph
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Externally supplied USD reference prices (oracle, CEX close, manual)
+CREATE TABLE IF NOT EXISTS token_price_anchors (
+    price_date DATE NOT NULL,
+    token_address BYTEA NOT NULL,
+    price_usd NUMERIC NOT NULL,
+    source VARCHAR(50),
+    created_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (price_date, token_address)
+);
+
+-- Daily USD prices used by the fact load
+CREATE TABLE IF NOT EXISTS token_prices_usd_day (
+    price_date DATE NOT NULL,
+    token_address BYTEA NOT NULL,
+    price_usd NUMERIC NOT NULL,
+    volume_usd NUMERIC,               -- USD volume behind a swap_vwap price
+    swap_count BIGINT,
+    source VARCHAR(20) NOT NULL,      -- stable, anchor or swap_vwap
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (price_date, token_address)
+);
+
+-- Hourly USD prices
+CREATE TABLE IF NOT EXISTS token_prices_usd_hour (
+    price_hour TIMESTAMP NOT NULL,
+    token_address BYTEA NOT NULL,
+    price_usd NUMERIC NOT NULL,
+    volume_usd NUMERIC,
+    swap_count BIGINT,
+    source VARCHAR(20) NOT NULL,
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (price_hour, token_address)
+);
+
+-- Daily ETH price for the facts' gas costs: native ETH, else the WETH predeploy
+CREATE OR REPLACE VIEW eth_prices_usd_day AS
+SELECT
+    price_date,
+    COALESCE(
+        MAX(price_usd) FILTER (WHERE token_address = '\x0000000000000000000000000000000000000000'::BYTEA),
+        MAX(price_usd) FILTER (WHERE token_address = '\x4200000000000000000000000000000000000006'::BYTEA)
+    ) AS price_usd
+FROM token_prices_usd_day
+WHERE token_address IN ('\x0000000000000000000000000000000000000000'::BYTEA,
+                        '\x4200000000000000000000000000000000000006'::BYTEA)
+GROUP BY price_date;
+
+-- Compute VWAP prices for every bucket ('day' or 'hour') from p_from onwards,
+-- up to the bucket holding p_to if given. Without p_from it resumes at the
+-- last stored bucket, which is recomputed because it may have been partial.
+-- Returns the number of rows written.
+DROP FUNCTION IF EXISTS refresh_token_prices(TEXT, TIMESTAMP);
+CREATE OR REPLACE FUNCTION refresh_token_prices(
+    p_grain TEXT DEFAULT 'day',
+    p_from TIMESTAMP DEFAULT NULL,
+    p_to TIMESTAMP DEFAULT NULL
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_from TIMESTAMP;
+    v_to TIMESTAMP;
+    v_added INTEGER;
+    v_rows INTEGER;
+BEGIN
+    IF p_grain NOT IN ('day', 'hour') THEN
+        RAISE EXCEPTION 'unsupported price grain: %', p_grain;
+    END IF;
+
+    IF p_grain = 'day' THEN
+        v_from := COALESCE(p_from, (SELECT MAX(price_date)::timestamp FROM token_prices_usd_day));
+    ELSE
+        v_from := COALESCE(p_from, (SELECT MAX(price_hour) FROM token_prices_usd_hour));
+    END IF;
+    v_from := COALESCE(date_trunc(p_grain, v_from), '-infinity');
+    v_to := COALESCE(date_trunc(p_grain, p_to) + ('1 ' || p_grain)::INTERVAL, 'infinity');
+
+    -- Swap legs as decimal-adjusted quantities per bucket
+    CREATE TEMP TABLE price_legs ON COMMIT DROP AS
+    SELECT
+        date_trunc(p_grain, s.block_time) AS bucket,
+        s.token0,
+        s.token1,
+        ABS(s.amount0) / (10::numeric ^ t0.decimals) AS qty0,
+        ABS(s.amount1) / (10::numeric ^ t1.decimals) AS qty1
+    FROM raw_unichain_swaps s
+    JOIN tokens t0 ON t0.token_address = s.token0
+    JOIN tokens t1 ON t1.token_address = s.token1
+    WHERE s.block_time >= v_from
+      AND s.block_time < v_to
+      AND s.amount0 <> 0
+      AND s.amount1 <> 0;
+
+    CREATE TEMP TABLE price_known (
+        bucket TIMESTAMP NOT NULL,
+        token_address BYTEA NOT NULL,
+        price_usd NUMERIC NOT NULL,
+        volume_usd NUMERIC,
+        swap_count BIGINT,
+        source VARCHAR(20) NOT NULL,
+        PRIMARY KEY (bucket, token_address)
+    ) ON COMMIT DROP;
+
+    -- Seed with stablecoins at par and external anchors
+    INSERT INTO price_known (bucket, token_address, price_usd, source)
+    SELECT b.bucket, t.token_address, 1, 'stable'
+    FROM (SELECT DISTINCT bucket FROM price_legs) b
+    CROSS JOIN tokens t
+    WHERE t.is_stable;
+
+    INSERT INTO price_known (bucket, token_address, price_usd, source)
+    SELECT b.bucket, a.token_address, a.price_usd, 'anchor'
+    FROM (SELECT DISTINCT bucket FROM price_legs) b
+    JOIN token_price_anchors a ON a.price_date = b.bucket::date
+    ON CONFLICT DO NOTHING;
+
+    -- Each pass prices tokens traded against an already-priced leg, walking
+    -- the token graph one hop at a time (e.g. USDC -> WETH -> WBTC)
+    FOR pass IN 1..3 LOOP
+        INSERT INTO price_known (bucket, token_address, price_usd, volume_usd, swap_count, source)
+        SELECT
+            legs.bucket,
+            legs.token_address,
+            SUM(legs.volume_usd) / SUM(legs.qty),
+            SUM(legs.volume_usd),
+            COUNT(*),
+            'swap_vwap'
+        FROM (
+            SELECT l.bucket, l.token1 AS token_address, l.qty1 AS qty, l.qty0 * k.price_usd AS volume_usd
+            FROM price_legs l
+            JOIN price_known k ON k.bucket = l.bucket AND k.token_address = l.token0
+            UNION ALL
+            SELECT l.bucket, l.token0, l.qty0, l.qty1 * k.price_usd
+            FROM price_legs l
+            JOIN price_known k ON k.bucket = l.bucket AND k.token_address = l.token1
+        ) legs
+        WHERE NOT EXISTS (
+            SELECT 1 FROM price_known k
+            WHERE k.bucket = legs.bucket AND k.token_address = legs.token_address
+        )
+        GROUP BY legs.bucket, legs.token_address;
+
+        GET DIAGNOSTICS v_added = ROW_COUNT;
+        EXIT WHEN v_added = 0;
+    END LOOP;
+
+    IF p_grain = 'day' THEN
+        INSERT INTO token_prices_usd_day (price_date, token_address, price_usd, volume_usd, swap_count, source)
+        SELECT bucket::date, token_address, price_usd, volume_usd, swap_count, source
+        FROM price_known
+        -- Key order keeps concurrent refreshes of the same bucket from deadlocking
+        ORDER BY bucket, token_address
+        ON CONFLICT (price_date, token_address) DO UPDATE SET
+            price_usd = EXCLUDED.price_usd,
+            volume_usd = EXCLUDED.volume_usd,
+            swap_count = EXCLUDED.swap_count,
+            source = EXCLUDED.source,
+            updated_at = NOW()
+        WHERE (token_prices_usd_day.price_usd, token_prices_usd_day.swap_count)
+            IS DISTINCT FROM (EXCLUDED.price_usd, EXCLUDED.swap_count);
+    ELSE
+        INSERT INTO token_prices_usd_hour (price_hour, token_address, price_usd, volume_usd, swap_count, source)
+        SELECT bucket, token_address, price_usd, volume_usd, swap_count, source
+        FROM price_known
+        ORDER BY bucket, token_address
+        ON CONFLICT (price_hour, token_address) DO UPDATE SET
+            price_usd = EXCLUDED.price_usd,
+            volume_usd = EXCLUDED.volume_usd,
+            swap_count = EXCLUDED.swap_count,
+            source = EXCLUDED.source,
+            updated_at = NOW()
+        WHERE (token_prices_usd_hour.price_usd, token_prices_usd_hour.swap_count)
+            IS DISTINCT FROM (EXCLUDED.price_usd, EXCLUDED.swap_count);
+    END IF;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+    DROP TABLE price_legs;
+    DROP TABLE price_known;
+    RETURN v_rows;
+END;
+$$;
@@ -0,0 +1,15 @@
+-- Per-stage bookkeeping for scripts/pipeline.py
+-- One row per (run_date, stage); a resumed run skips stages that already
+-- succeeded for its run_date.
+
+CREATE TABLE IF NOT EXISTS labs_solo.pipeline_runs (
+    run_date DATE NOT NULL,
+    stage VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL,      -- running, succeeded, failed, skipped
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    duration_seconds NUMERIC(12, 3),
+    row_count BIGINT,
+    error TEXT,
+    PRIMARY KEY (run_date, stage)
+);
@@ -0,0 +1,34 @@
+-- Change notifications for the refresher daemon (scripts/refresher_daemon.py)
+-- One NOTIFY per INSERT statement on raw_unichain_swaps, summarising the new
+-- rows, so bulk writes by the indexer do not produce one message per row.
+
+CREATE OR REPLACE FUNCTION notify_raw_swaps_inserted()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_rows BIGINT;
+    v_min_block BIGINT;
+    v_max_block BIGINT;
+BEGIN
+    SELECT COUNT(*), MIN(block_number), MAX(block_number)
+    INTO v_rows, v_min_block, v_max_block
+    FROM new_rows;
+
+    IF v_rows > 0 THEN
+        PERFORM pg_notify('raw_swaps_inserted', json_build_object(
+            'rows', v_rows,
+            'min_block', v_min_block,
+            'max_block', v_max_block
+        )::text);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_raw_swaps_notify ON raw_unichain_swaps;
+CREATE TRIGGER trg_raw_swaps_notify
+    AFTER INSERT ON raw_unichain_swaps
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_raw_swaps_inserted();
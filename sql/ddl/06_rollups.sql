@@ -0,0 +1,258 @@
+-- Pre-aggregated rollups of the fact table for dashboards (queries.graphql)
+-- Maintained incrementally by statement-level triggers on
+-- labs_solo.pool_swap_fact_unichain_base: every INSERT/UPDATE/DELETE adds the
+-- new rows and subtracts the old ones, so sums and counts stay exact when
+-- facts are re-enriched. labs_solo.rebuild_rollups() recomputes them from scratch.
+
+-- Volume per pool and hour / day
+CREATE TABLE IF NOT EXISTS labs_solo.pool_volume_hour (
+    bucket TIMESTAMP NOT NULL,
+    pool_address BYTEA NOT NULL,
+    swap_count BIGINT NOT NULL,
+    amount0_abs NUMERIC NOT NULL,     -- raw token units
+    amount1_abs NUMERIC NOT NULL,
+    volume_usd NUMERIC NOT NULL,
+    PRIMARY KEY (bucket, pool_address)
+);
+
+CREATE TABLE IF NOT EXISTS labs_solo.pool_volume_day (
+    bucket DATE NOT NULL,
+    pool_address BYTEA NOT NULL,
+    swap_count BIGINT NOT NULL,
+    amount0_abs NUMERIC NOT NULL,
+    amount1_abs NUMERIC NOT NULL,
+    volume_usd NUMERIC NOT NULL,
+    PRIMARY KEY (bucket, pool_address)
+);
+
+-- Per-trader totals per day
+CREATE TABLE IF NOT EXISTS labs_solo.trader_volume_day (
+    day DATE NOT NULL,
+    trader BYTEA NOT NULL,
+    flow_source VARCHAR(100) NOT NULL,
+    swap_count BIGINT NOT NULL,
+    amount0_abs NUMERIC NOT NULL,
+    amount1_abs NUMERIC NOT NULL,
+    volume_usd NUMERIC NOT NULL,
+    PRIMARY KEY (day, trader, flow_source)
+);
+
+-- Gas histogram per day, flow_source and hop_index in 10k-gas buckets
+-- (gas_bucket is the bucket's lower bound; 1M and above share one bucket).
+-- Facts still waiting for gas data are not counted.
+CREATE TABLE IF NOT EXISTS labs_solo.gas_histogram_day (
+    day DATE NOT NULL,
+    flow_source VARCHAR(100) NOT NULL,
+    hop_index INTEGER NOT NULL,
+    gas_bucket BIGINT NOT NULL,
+    swap_count BIGINT NOT NULL,
+    gas_used NUMERIC NOT NULL,
+    PRIMARY KEY (day, flow_source, hop_index, gas_bucket)
+);
+
+CREATE INDEX IF NOT EXISTS idx_trader_volume_day_volume ON labs_solo.trader_volume_day (day, volume_usd DESC);
+
+-- Fold the signed rows of the session's rollup_delta temp table into every
+-- rollup, dropping groups whose count fell to zero. Groups are upserted in key
+-- order, so concurrent loads sharing a day (pool shards, backfill ranges) wait
+-- for each other instead of deadlocking.
+CREATE OR REPLACE FUNCTION labs_solo.apply_rollup_delta()
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO labs_solo.pool_volume_hour AS r
+        (bucket, pool_address, swap_count, amount0_abs, amount1_abs, volume_usd)
+    SELECT date_trunc('hour', block_time), pool_address,
+           SUM(sign), SUM(sign * amount0_abs), SUM(sign * amount1_abs), SUM(sign * volume_usd)
+    FROM rollup_delta
+    GROUP BY 1, 2
+    HAVING SUM(sign) <> 0 OR SUM(sign * volume_usd) <> 0
+    ORDER BY 1, 2
+    ON CONFLICT (bucket, pool_address) DO UPDATE SET
+        swap_count = r.swap_count + EXCLUDED.swap_count,
+        amount0_abs = r.amount0_abs + EXCLUDED.amount0_abs,
+        amount1_abs = r.amount1_abs + EXCLUDED.amount1_abs,
+        volume_usd = r.volume_usd + EXCLUDED.volume_usd;
+
+    INSERT INTO labs_solo.pool_volume_day AS r
+        (bucket, pool_address, swap_count, amount0_abs, amount1_abs, volume_usd)
+    SELECT block_time::date, pool_address,
+           SUM(sign), SUM(sign * amount0_abs), SUM(sign * amount1_abs), SUM(sign * volume_usd)
+    FROM rollup_delta
+    GROUP BY 1, 2
+    HAVING SUM(sign) <> 0 OR SUM(sign * volume_usd) <> 0
+    ORDER BY 1, 2
+    ON CONFLICT (bucket, pool_address) DO UPDATE SET
+        swap_count = r.swap_count + EXCLUDED.swap_count,
+        amount0_abs = r.amount0_abs + EXCLUDED.amount0_abs,
+        amount1_abs = r.amount1_abs + EXCLUDED.amount1_abs,
+        volume_usd = r.volume_usd + EXCLUDED.volume_usd;
+
+    INSERT INTO labs_solo.trader_volume_day AS r
+        (day, trader, flow_source, swap_count, amount0_abs, amount1_abs, volume_usd)
+    SELECT block_time::date, trader, flow_source,
+           SUM(sign), SUM(sign * amount0_abs), SUM(sign * amount1_abs), SUM(sign * volume_usd)
+    FROM rollup_delta
+    GROUP BY 1, 2, 3
+    HAVING SUM(sign) <> 0 OR SUM(sign * volume_usd) <> 0
+    ORDER BY 1, 2, 3
+    ON CONFLICT (day, trader, flow_source) DO UPDATE SET
+        swap_count = r.swap_count + EXCLUDED.swap_count,
+        amount0_abs = r.amount0_abs + EXCLUDED.amount0_abs,
+        amount1_abs = r.amount1_abs + EXCLUDED.amount1_abs,
+        volume_usd = r.volume_usd + EXCLUDED.volume_usd;
+
+    INSERT INTO labs_solo.gas_histogram_day AS r
+        (day, flow_source, hop_index, gas_bucket, swap_count, gas_used)
+    SELECT block_time::date, flow_source, hop_index, LEAST(gas_used / 10000 * 10000, 1000000),
+           SUM(sign), SUM(sign * gas_used)
+    FROM rollup_delta
+    WHERE gas_used IS NOT NULL
+    GROUP BY 1, 2, 3, 4
+    HAVING SUM(sign) <> 0
+    ORDER BY 1, 2, 3, 4
+    ON CONFLICT (day, flow_source, hop_index, gas_bucket) DO UPDATE SET
+        swap_count = r.swap_count + EXCLUDED.swap_count,
+        gas_used = r.gas_used + EXCLUDED.gas_used;
+
+    -- Groups emptied by deletes or by facts moving to another flow_source/hop
+    DELETE FROM labs_solo.pool_volume_hour r
+    USING (SELECT DISTINCT date_trunc('hour', block_time) AS bucket, pool_address FROM rollup_delta WHERE sign < 0) d
+    WHERE r.bucket = d.bucket AND r.pool_address = d.pool_address AND r.swap_count = 0;
+
+    DELETE FROM labs_solo.pool_volume_day r
+    USING (SELECT DISTINCT block_time::date AS bucket, pool_address FROM rollup_delta WHERE sign < 0) d
+    WHERE r.bucket = d.bucket AND r.pool_address = d.pool_address AND r.swap_count = 0;
+
+    DELETE FROM labs_solo.trader_volume_day r
+    USING (SELECT DISTINCT block_time::date AS day, trader, flow_source FROM rollup_delta WHERE sign < 0) d
+    WHERE r.day = d.day AND r.trader = d.trader AND r.flow_source = d.flow_source AND r.swap_count = 0;
+
+    DELETE FROM labs_solo.gas_histogram_day r
+    USING (SELECT DISTINCT block_time::date AS day, flow_source, hop_index FROM rollup_delta WHERE sign < 0) d
+    WHERE r.day = d.day AND r.flow_source = d.flow_source AND r.hop_index = d.hop_index AND r.swap_count = 0;
+END;
+$$;
+
+-- Make sure the session has an empty rollup_delta temp table
+CREATE OR REPLACE FUNCTION labs_solo.prepare_rollup_delta()
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF to_regclass('pg_temp.rollup_delta') IS NULL THEN
+        CREATE TEMP TABLE rollup_delta (
+            sign INTEGER NOT NULL,
+            block_time TIMESTAMP NOT NULL,
+            pool_address BYTEA NOT NULL,
+            trader BYTEA NOT NULL,
+            flow_source VARCHAR(100) NOT NULL,
+            hop_index INTEGER NOT NULL,
+            gas_used BIGINT,
+            amount0_abs NUMERIC NOT NULL,
+            amount1_abs NUMERIC NOT NULL,
+            volume_usd NUMERIC NOT NULL
+        ) ON COMMIT DELETE ROWS;
+    ELSE
+        TRUNCATE rollup_delta;
+    END IF;
+END;
+$$;
+
+-- Volume now comes from the facts' precomputed volume_usd
+DROP FUNCTION IF EXISTS labs_solo.fact_rollup_volume_usd(NUMERIC, NUMERIC, NUMERIC, NUMERIC, SMALLINT, SMALLINT);
+
+CREATE OR REPLACE FUNCTION labs_solo.rollup_fact_changes()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_rows INTEGER := 0;
+    v_count INTEGER;
+BEGIN
+    PERFORM labs_solo.prepare_rollup_delta();
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO rollup_delta
+        SELECT 1, f.block_time, p.pool_address, tr.address, COALESCE(fs.flow_source, 'Other'), f.hop_index,
+               f.gas_used, ABS(f.amount0), ABS(f.amount1), f.volume_usd::NUMERIC
+        FROM new_rows f
+        JOIN labs_solo.dim_pool p ON p.pool_id = f.pool_id
+        JOIN labs_solo.dim_trader tr ON tr.trader_id = f.trader_id
+        LEFT JOIN labs_solo.dim_flow_source fs ON fs.flow_source_id = f.flow_source_id;
+        GET DIAGNOSTICS v_count = ROW_COUNT;
+        v_rows := v_rows + v_count;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO rollup_delta
+        SELECT -1, f.block_time, p.pool_address, tr.address, COALESCE(fs.flow_source, 'Other'), f.hop_index,
+               f.gas_used, ABS(f.amount0), ABS(f.amount1), f.volume_usd::NUMERIC
+        FROM old_rows f
+        JOIN labs_solo.dim_pool p ON p.pool_id = f.pool_id
+        JOIN labs_solo.dim_trader tr ON tr.trader_id = f.trader_id
+        LEFT JOIN labs_solo.dim_flow_source fs ON fs.flow_source_id = f.flow_source_id;
+        GET DIAGNOSTICS v_count = ROW_COUNT;
+        v_rows := v_rows + v_count;
+    END IF;
+
+    IF v_rows > 0 THEN
+        PERFORM labs_solo.apply_rollup_delta();
+        TRUNCATE rollup_delta;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- Transition tables allow one event per trigger
+DROP TRIGGER IF EXISTS trg_fact_rollup_insert ON labs_solo.pool_swap_fact_unichain_base;
+CREATE TRIGGER trg_fact_rollup_insert
+    AFTER INSERT ON labs_solo.pool_swap_fact_unichain_base
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION labs_solo.rollup_fact_changes();
+
+DROP TRIGGER IF EXISTS trg_fact_rollup_update ON labs_solo.pool_swap_fact_unichain_base;
+CREATE TRIGGER trg_fact_rollup_update
+    AFTER UPDATE ON labs_solo.pool_swap_fact_unichain_base
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION labs_solo.rollup_fact_changes();
+
+DROP TRIGGER IF EXISTS trg_fact_rollup_delete ON labs_solo.pool_swap_fact_unichain_base;
+CREATE TRIGGER trg_fact_rollup_delete
+    AFTER DELETE ON labs_solo.pool_swap_fact_unichain_base
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION labs_solo.rollup_fact_changes();
+
+-- Recompute the rollups from the fact table for days at or after p_from
+-- (all history when NULL), e.g. to backfill facts loaded before the triggers
+-- existed. Returns the fact rows aggregated.
+CREATE OR REPLACE FUNCTION labs_solo.rebuild_rollups(p_from TIMESTAMP DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_from TIMESTAMP := COALESCE(date_trunc('day', p_from), '-infinity');
+    v_rows INTEGER;
+BEGIN
+    DELETE FROM labs_solo.pool_volume_hour WHERE bucket >= v_from;
+    DELETE FROM labs_solo.pool_volume_day WHERE bucket >= v_from;
+    DELETE FROM labs_solo.trader_volume_day WHERE day >= v_from;
+    DELETE FROM labs_solo.gas_histogram_day WHERE day >= v_from;
+
+    PERFORM labs_solo.prepare_rollup_delta();
+    INSERT INTO rollup_delta
+    SELECT 1, f.block_time, p.pool_address, tr.address, COALESCE(fs.flow_source, 'Other'), f.hop_index,
+           f.gas_used, ABS(f.amount0), ABS(f.amount1), f.volume_usd::NUMERIC
+    FROM labs_solo.pool_swap_fact_unichain_base f
+    JOIN labs_solo.dim_pool p ON p.pool_id = f.pool_id
+    JOIN labs_solo.dim_trader tr ON tr.trader_id = f.trader_id
+    LEFT JOIN labs_solo.dim_flow_source fs ON fs.flow_source_id = f.flow_source_id
+    WHERE f.block_time >= v_from;
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+    PERFORM labs_solo.apply_rollup_delta();
+    TRUNCATE rollup_delta;
+    RETURN v_rows;
+END;
+$$;
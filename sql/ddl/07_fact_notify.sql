@@ -0,0 +1,46 @@
+-- Change notifications for the query cache API (scripts/query_api.py)
+-- One NOTIFY per statement that changes fact rows (loads, re-enrichment,
+-- recomputes), delivered when the transaction commits. The rollups change
+-- only through the fact triggers, so this covers them too.
+
+CREATE OR REPLACE FUNCTION labs_solo.notify_fact_changes()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_rows BIGINT;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        SELECT COUNT(*) INTO v_rows FROM old_rows;
+    ELSE
+        SELECT COUNT(*) INTO v_rows FROM new_rows;
+    END IF;
+
+    IF v_rows > 0 THEN
+        PERFORM pg_notify('fact_changes', json_build_object(
+            'op', lower(TG_OP),
+            'rows', v_rows
+        )::text);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- Transition tables allow one event per trigger
+DROP TRIGGER IF EXISTS trg_fact_notify_insert ON labs_solo.pool_swap_fact_unichain_base;
+CREATE TRIGGER trg_fact_notify_insert
+    AFTER INSERT ON labs_solo.pool_swap_fact_unichain_base
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION labs_solo.notify_fact_changes();
+
+DROP TRIGGER IF EXISTS trg_fact_notify_update ON labs_solo.pool_swap_fact_unichain_base;
+CREATE TRIGGER trg_fact_notify_update
+    AFTER UPDATE ON labs_solo.pool_swap_fact_unichain_base
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION labs_solo.notify_fact_changes();
+
+DROP TRIGGER IF EXISTS trg_fact_notify_delete ON labs_solo.pool_swap_fact_unichain_base;
+CREATE TRIGGER trg_fact_notify_delete
+    AFTER DELETE ON labs_solo.pool_swap_fact_unichain_base
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION labs_solo.notify_fact_changes();
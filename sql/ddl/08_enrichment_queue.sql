@@ -0,0 +1,188 @@
+-- Work queue for gas and contract-flag enrichment (scripts/work_queue.py)
+-- Swap txs without gas data (kind 'receipt') and senders needing an
+-- eth_getCode lookup (kind 'code') are queued here. Workers claim batches
+-- with FOR UPDATE SKIP LOCKED under a lease and delete each item in the
+-- transaction that writes its result; items whose lease runs out (the worker
+-- died or the lookup failed) go back to the queue, up to a maximum of attempts.
+
+CREATE TABLE IF NOT EXISTS enrichment_queue (
+    kind VARCHAR(16) NOT NULL CHECK (kind IN ('receipt', 'code')),
+    item BYTEA NOT NULL,                -- tx hash or sender address
+    block_number BIGINT NOT NULL,       -- first swap block; claims go in block order
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,                   -- worker holding the item (NULL = pending)
+    lease_expires_at TIMESTAMP,
+    enqueued_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (kind, item)
+);
+
+CREATE INDEX IF NOT EXISTS idx_enrichment_queue_pending ON enrichment_queue (kind, block_number)
+    WHERE lease_owner IS NULL;
+CREATE INDEX IF NOT EXISTS idx_enrichment_queue_leased ON enrichment_queue (kind, lease_expires_at)
+    WHERE lease_owner IS NOT NULL;
+
+-- Highest raw swap block already scanned into the queue, per kind
+CREATE TABLE IF NOT EXISTS enrichment_enqueue_watermark (
+    kind VARCHAR(16) PRIMARY KEY,
+    last_block_number BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Queue what is missing for swaps at or after p_from_block; returns items added.
+-- Same selection as fetch_receipts.py / mark_contracts.py: swaps in enabled
+-- registered pools, EOAs again once their last check is older than p_recheck_ttl.
+-- Scans start at the kind's watermark, so idle workers only look at new
+-- blocks; p_rescan scans all of history again (the daily pipeline does, to
+-- pick up new pools, rechecks and failed items). The watermark moves to the
+-- last raw block whenever the scan covered everything after it.
+-- Only one caller scans per kind at a time; the others wait for its items to
+-- commit and return 0 instead of repeating the scan (a rescan still runs).
+DROP FUNCTION IF EXISTS enqueue_enrichment(TEXT, BIGINT, INTERVAL);
+CREATE OR REPLACE FUNCTION enqueue_enrichment(
+    p_kind TEXT,
+    p_from_block BIGINT DEFAULT NULL,
+    p_recheck_ttl INTERVAL DEFAULT NULL,
+    p_rescan BOOLEAN DEFAULT FALSE
+)
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_rows BIGINT;
+    v_scanned BIGINT;
+    v_from BIGINT;
+    v_head BIGINT;
+BEGIN
+    IF NOT pg_try_advisory_xact_lock(hashtext('enqueue_enrichment'), hashtext(p_kind)) THEN
+        PERFORM pg_advisory_xact_lock(hashtext('enqueue_enrichment'), hashtext(p_kind));
+        IF NOT p_rescan THEN
+            RETURN 0;
+        END IF;
+    END IF;
+
+    SELECT last_block_number INTO v_scanned FROM enrichment_enqueue_watermark WHERE kind = p_kind;
+    -- The watermark block itself is scanned again: it may have been half written
+    v_from := CASE WHEN p_rescan THEN COALESCE(p_from_block, 0)
+                   ELSE GREATEST(COALESCE(p_from_block, 0), COALESCE(v_scanned, 0)) END;
+    SELECT MAX(block_number) INTO v_head FROM raw_unichain_swaps;
+
+    IF p_kind = 'receipt' THEN
+        INSERT INTO enrichment_queue (kind, item, block_number)
+        SELECT 'receipt', s.tx_hash, MIN(s.block_number)
+        FROM raw_unichain_swaps s
+        JOIN pools p ON p.pool_address = s.pool_address
+        LEFT JOIN tx_gas g ON s.tx_hash = g.tx_hash
+        WHERE g.tx_hash IS NULL
+          AND p.enabled
+          AND s.block_number >= GREATEST(p.start_block, v_from)
+          AND s.block_number <= v_head
+        GROUP BY s.tx_hash
+        ORDER BY 3
+        ON CONFLICT (kind, item) DO NOTHING;
+    ELSIF p_kind = 'code' THEN
+        INSERT INTO enrichment_queue (kind, item, block_number)
+        SELECT 'code', s.sender, MIN(s.block_number)
+        FROM raw_unichain_swaps s
+        JOIN pools p ON p.pool_address = s.pool_address
+        LEFT JOIN address_labels l ON s.sender = l.address
+        WHERE p.enabled
+          AND s.block_number >= GREATEST(p.start_block, v_from)
+          AND s.block_number <= v_head
+          AND (
+              l.address IS NULL
+              OR (
+                  NOT COALESCE(l.is_contract, FALSE)
+                  AND (l.code_checked_at IS NULL OR l.code_checked_at < NOW() - p_recheck_ttl)
+              )
+          )
+        GROUP BY s.sender
+        ORDER BY 3
+        ON CONFLICT (kind, item) DO NOTHING;
+    ELSE
+        RAISE EXCEPTION 'unknown enrichment kind %', p_kind;
+    END IF;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+    IF v_head IS NOT NULL AND COALESCE(p_from_block, 0) <= COALESCE(v_scanned, 0) THEN
+        INSERT INTO enrichment_enqueue_watermark (kind, last_block_number, updated_at)
+        VALUES (p_kind, v_head, NOW())
+        ON CONFLICT (kind) DO UPDATE SET
+            last_block_number = GREATEST(enrichment_enqueue_watermark.last_block_number, EXCLUDED.last_block_number),
+            updated_at = NOW();
+    END IF;
+    RETURN v_rows;
+END;
+$$;
+
+-- Return items of a kind whose lease has expired to the queue; returns items requeued
+CREATE OR REPLACE FUNCTION requeue_expired_enrichment(p_kind TEXT)
+RETURNS BIGINT
+LANGUAGE sql
+AS $$
+    WITH expired AS (
+        SELECT kind, item
+        FROM enrichment_queue
+        WHERE kind = p_kind AND lease_owner IS NOT NULL AND lease_expires_at < NOW()
+        FOR UPDATE SKIP LOCKED
+    ), requeued AS (
+        UPDATE enrichment_queue q
+        SET lease_owner = NULL, lease_expires_at = NULL
+        FROM expired e
+        WHERE q.kind = e.kind AND q.item = e.item
+        RETURNING 1
+    )
+    SELECT COUNT(*) FROM requeued;
+$$;
+
+-- Lease about p_limit pending items of a kind to p_owner, oldest blocks first,
+-- optionally only items between p_from_block and p_to_block (so the refresher
+-- daemon claims its own micro-batch and leaves any backlog to the workers).
+-- The batch is topped up with the other pending items of its last block, the
+-- only one LIMIT can cut, so a block's receipts are fetched once. Rows claimed by concurrent workers are
+-- skipped rather than waited on.
+DROP FUNCTION IF EXISTS claim_enrichment(TEXT, TEXT, INTEGER, INTERVAL, INTEGER);
+CREATE OR REPLACE FUNCTION claim_enrichment(
+    p_kind TEXT,
+    p_owner TEXT,
+    p_limit INTEGER,
+    p_lease INTERVAL,
+    p_max_attempts INTEGER DEFAULT 5,
+    p_from_block BIGINT DEFAULT NULL,
+    p_to_block BIGINT DEFAULT NULL
+)
+RETURNS TABLE (item BYTEA, block_number BIGINT)
+LANGUAGE sql
+AS $$
+    WITH first_items AS (
+        SELECT q.kind, q.item, q.block_number
+        FROM enrichment_queue q
+        WHERE q.kind = p_kind
+          AND q.lease_owner IS NULL
+          AND q.attempts < p_max_attempts
+          AND q.block_number >= COALESCE(p_from_block, q.block_number)
+          AND q.block_number <= COALESCE(p_to_block, q.block_number)
+        ORDER BY q.block_number
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    ), last_block_items AS (
+        SELECT q.kind, q.item
+        FROM enrichment_queue q
+        WHERE q.kind = p_kind
+          AND q.lease_owner IS NULL
+          AND q.attempts < p_max_attempts
+          AND q.block_number = (SELECT MAX(block_number) FROM first_items)
+        FOR UPDATE SKIP LOCKED
+    ), claimable AS (
+        SELECT kind, item FROM first_items
+        UNION
+        SELECT kind, item FROM last_block_items
+    )
+    UPDATE enrichment_queue q
+    SET lease_owner = p_owner,
+        lease_expires_at = NOW() + p_lease,
+        attempts = q.attempts + 1
+    FROM claimable c
+    WHERE q.kind = c.kind AND q.item = c.item
+    RETURNING q.item, q.block_number;
+$$;
@@ -0,0 +1,26 @@
+-- Per-range checkpoints for scripts/backfill.py
+-- A backfill splits [start_block, end_block] into ranges; one row per range
+-- records its status and counts, so a killed or failed backfill resumes with
+-- the ranges that have not succeeded.
+
+CREATE TABLE IF NOT EXISTS labs_solo.backfill_ranges (
+    backfill_id VARCHAR(100) NOT NULL,
+    start_block BIGINT NOT NULL,
+    end_block BIGINT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',   -- pending, running, succeeded, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    swap_count BIGINT,
+    gas_count INTEGER,
+    label_count INTEGER,
+    price_count INTEGER,
+    fact_count INTEGER,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    duration_seconds NUMERIC(12, 3),
+    error TEXT,
+    created_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (backfill_id, start_block)
+);
+
+-- Columns added after the initial release
+ALTER TABLE labs_solo.backfill_ranges ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT NOW();
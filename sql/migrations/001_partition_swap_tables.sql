@@ -0,0 +1,135 @@
+-- Convert raw_unichain_swaps and labs_solo.pool_swap_fact_unichain from plain
+-- heap tables to monthly partitioned tables (sql/ddl/00_partitioning.sql).
+-- Needed once on databases initialised before partitioning; fresh installs
+-- get partitioned tables from init_schema.sh directly.
+-- The facts are copied into the partitioned wide layout defined below (not
+-- the current sql/ddl/01_tables.sql); run 002_fact_dimensions.sql right after
+-- to move them to the keyed layout and install the current load and rollup
+-- functions.
+--
+-- Run from this directory as a single transaction, with writers stopped:
+--   psql -v ON_ERROR_STOP=1 -1 -f 001_partition_swap_tables.sql
+-- The old tables are kept as *_heap until the row counts are verified.
+
+-- Move the heap tables (and their key/index names) out of the way
+ALTER TABLE raw_unichain_swaps RENAME TO raw_unichain_swaps_heap;
+ALTER TABLE raw_unichain_swaps_heap RENAME CONSTRAINT raw_unichain_swaps_pkey TO raw_unichain_swaps_heap_pkey;
+DROP TRIGGER IF EXISTS trg_raw_swaps_notify ON raw_unichain_swaps_heap;
+DROP INDEX IF EXISTS idx_raw_swaps_pool_time, idx_raw_swaps_time, idx_raw_swaps_sender,
+    idx_raw_swaps_pool_block, idx_raw_swaps_block;
+
+ALTER TABLE labs_solo.pool_swap_fact_unichain RENAME TO pool_swap_fact_unichain_heap;
+ALTER TABLE labs_solo.pool_swap_fact_unichain_heap
+    RENAME CONSTRAINT pool_swap_fact_unichain_pkey TO pool_swap_fact_unichain_heap_pkey;
+ALTER TABLE labs_solo.pool_swap_fact_unichain_heap ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT NOW();
+DROP TRIGGER IF EXISTS trg_fact_rollup_insert ON labs_solo.pool_swap_fact_unichain_heap;
+DROP TRIGGER IF EXISTS trg_fact_rollup_update ON labs_solo.pool_swap_fact_unichain_heap;
+DROP TRIGGER IF EXISTS trg_fact_rollup_delete ON labs_solo.pool_swap_fact_unichain_heap;
+DROP INDEX IF EXISTS labs_solo.idx_fact_time, labs_solo.idx_fact_pool, labs_solo.idx_fact_trader,
+    labs_solo.idx_fact_missing_gas, labs_solo.idx_fact_unlabeled,
+    labs_solo.idx_fact_unpriced0, labs_solo.idx_fact_unpriced1;
+
+-- Create the partitioned tables and their indexes. The fact table is the wide
+-- layout 002_fact_dimensions.sql converts from, so it is defined here rather
+-- than taken from sql/ddl/01_tables.sql.
+\ir ../ddl/00_partitioning.sql
+
+CREATE TABLE raw_unichain_swaps (
+    block_time TIMESTAMP NOT NULL,
+    block_number BIGINT NOT NULL,
+    tx_hash BYTEA NOT NULL,
+    log_index INTEGER NOT NULL,
+    pool_address BYTEA NOT NULL,
+    token0 BYTEA NOT NULL,
+    token1 BYTEA NOT NULL,
+    amount0 NUMERIC NOT NULL,
+    amount1 NUMERIC NOT NULL,
+    sender BYTEA NOT NULL,    -- msg.sender (trader or contract)
+    origin BYTEA,             -- tx.origin (EOA)
+    created_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (tx_hash, log_index, block_time)   -- partition key must be part of the key
+) PARTITION BY RANGE (block_time);
+
+CREATE TABLE raw_unichain_swaps_default PARTITION OF raw_unichain_swaps DEFAULT;
+
+CREATE TABLE labs_solo.pool_swap_fact_unichain (
+    block_time TIMESTAMP NOT NULL,
+    tx_hash BYTEA NOT NULL,
+    log_index INTEGER NOT NULL,
+    pool_address BYTEA NOT NULL,
+    token0 BYTEA NOT NULL,
+    token1 BYTEA NOT NULL,
+    amount0 NUMERIC NOT NULL,
+    amount1 NUMERIC NOT NULL,
+    price0_usd NUMERIC DEFAULT 0,
+    price1_usd NUMERIC DEFAULT 0,
+    trader BYTEA NOT NULL,
+    is_contract BOOLEAN DEFAULT FALSE,
+    flow_source VARCHAR(100) DEFAULT 'Other',
+    hop_index INTEGER DEFAULT 1,
+    gas_used BIGINT,
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (tx_hash, log_index, block_time)
+) PARTITION BY RANGE (block_time);
+
+CREATE TABLE labs_solo.pool_swap_fact_unichain_default PARTITION OF labs_solo.pool_swap_fact_unichain DEFAULT;
+
+CREATE INDEX idx_raw_swaps_pool_time ON raw_unichain_swaps (pool_address, block_time);
+CREATE INDEX idx_raw_swaps_time_brin ON raw_unichain_swaps USING brin (block_time);
+CREATE INDEX idx_raw_swaps_sender ON raw_unichain_swaps (sender);
+CREATE INDEX idx_raw_swaps_pool_block ON raw_unichain_swaps (pool_address, block_number);
+CREATE INDEX idx_raw_swaps_block ON raw_unichain_swaps (block_number);
+CREATE INDEX idx_fact_time_brin ON labs_solo.pool_swap_fact_unichain USING brin (block_time);
+CREATE INDEX idx_fact_pool ON labs_solo.pool_swap_fact_unichain (pool_address);
+CREATE INDEX idx_fact_trader ON labs_solo.pool_swap_fact_unichain (trader);
+
+\ir ../ddl/05_raw_swap_notify.sql
+
+-- Partitions for every month present in the old data
+SELECT ensure_monthly_partitions('public', 'raw_unichain_swaps',
+    (SELECT MIN(block_time)::date FROM raw_unichain_swaps_heap));
+SELECT ensure_monthly_partitions('labs_solo', 'pool_swap_fact_unichain',
+    (SELECT MIN(block_time)::date FROM labs_solo.pool_swap_fact_unichain_heap));
+
+-- Copy the rows; the trigger only notifies the refresher daemon, which skips
+-- facts that are already loaded
+INSERT INTO raw_unichain_swaps (
+    block_time, block_number, tx_hash, log_index, pool_address, token0, token1,
+    amount0, amount1, sender, origin, created_at
+)
+SELECT
+    block_time, block_number, tx_hash, log_index, pool_address, token0, token1,
+    amount0, amount1, sender, origin, created_at
+FROM raw_unichain_swaps_heap;
+
+INSERT INTO labs_solo.pool_swap_fact_unichain (
+    block_time, tx_hash, log_index, pool_address, token0, token1, amount0, amount1,
+    price0_usd, price1_usd, trader, is_contract, flow_source, hop_index, gas_used,
+    created_at, updated_at
+)
+SELECT
+    block_time, tx_hash, log_index, pool_address, token0, token1, amount0, amount1,
+    price0_usd, price1_usd, trader, is_contract, flow_source, hop_index, gas_used,
+    created_at, updated_at
+FROM labs_solo.pool_swap_fact_unichain_heap;
+
+DO $$
+BEGIN
+    IF (SELECT COUNT(*) FROM raw_unichain_swaps) <> (SELECT COUNT(*) FROM raw_unichain_swaps_heap)
+       OR (SELECT COUNT(*) FROM labs_solo.pool_swap_fact_unichain)
+          <> (SELECT COUNT(*) FROM labs_solo.pool_swap_fact_unichain_heap) THEN
+        RAISE EXCEPTION 'row counts differ after copying into the partitioned tables';
+    END IF;
+END;
+$$;
+
+ANALYZE raw_unichain_swaps;
+ANALYZE labs_solo.pool_swap_fact_unichain;
+
+-- The rollup triggers are attached by 002_fact_dimensions.sql, to the keyed
+-- table, so the copy above is not counted on top of existing rollups.
+
+-- Once verified:
+--   DROP TABLE raw_unichain_swaps_heap;
+--   DROP TABLE labs_solo.pool_swap_fact_unichain_heap;
@@ -0,0 +1,101 @@
+-- Move labs_solo.pool_swap_fact_unichain to the dimension-keyed layout
+-- (sql/ddl/01_tables.sql): the facts go to pool_swap_fact_unichain_base with
+-- integer pool, token, trader and flow_source keys, and
+-- labs_solo.pool_swap_fact_unichain becomes a view with the old columns.
+-- Needed once on databases initialised before the dimension tables; fresh
+-- installs get the new layout from init_schema.sh directly.
+--
+-- Run from this directory as a single transaction, with writers stopped:
+--   psql -v ON_ERROR_STOP=1 -1 -f 002_fact_dimensions.sql
+-- then reload the Hasura metadata so it picks up the view. The old table is
+-- kept as pool_swap_fact_unichain_wide until the row counts are verified.
+
+-- Move the old table (and its key/index names) out of the way
+ALTER TABLE labs_solo.pool_swap_fact_unichain RENAME TO pool_swap_fact_unichain_wide;
+ALTER TABLE labs_solo.pool_swap_fact_unichain_wide
+    RENAME CONSTRAINT pool_swap_fact_unichain_pkey TO pool_swap_fact_unichain_wide_pkey;
+ALTER TABLE labs_solo.pool_swap_fact_unichain_wide ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT NOW();
+DROP TRIGGER IF EXISTS trg_fact_rollup_insert ON labs_solo.pool_swap_fact_unichain_wide;
+DROP TRIGGER IF EXISTS trg_fact_rollup_update ON labs_solo.pool_swap_fact_unichain_wide;
+DROP TRIGGER IF EXISTS trg_fact_rollup_delete ON labs_solo.pool_swap_fact_unichain_wide;
+DROP INDEX IF EXISTS labs_solo.idx_fact_time_brin, labs_solo.idx_fact_pool, labs_solo.idx_fact_trader,
+    labs_solo.idx_fact_updated_brin, labs_solo.idx_fact_missing_gas, labs_solo.idx_fact_unlabeled,
+    labs_solo.idx_fact_unpriced0, labs_solo.idx_fact_unpriced1;
+
+-- Create the dimensions, the keyed table, the view and the load functions
+\ir ../ddl/01_tables.sql
+\ir ../ddl/02_fact_load.sql
+\ir ../ddl/03_prices.sql
+
+SELECT ensure_monthly_partitions('labs_solo', 'pool_swap_fact_unichain_base',
+    (SELECT MIN(block_time)::date FROM labs_solo.pool_swap_fact_unichain_wide));
+
+-- Keys for every pool, token, trader and flow_source in the old rows
+INSERT INTO labs_solo.dim_pool (pool_address)
+SELECT DISTINCT pool_address FROM labs_solo.pool_swap_fact_unichain_wide
+ORDER BY pool_address
+ON CONFLICT (pool_address) DO NOTHING;
+
+INSERT INTO labs_solo.dim_token (token_address)
+SELECT token0 FROM labs_solo.pool_swap_fact_unichain_wide
+UNION
+SELECT token1 FROM labs_solo.pool_swap_fact_unichain_wide
+ORDER BY 1
+ON CONFLICT (token_address) DO NOTHING;
+
+INSERT INTO labs_solo.dim_trader (address)
+SELECT DISTINCT trader FROM labs_solo.pool_swap_fact_unichain_wide
+ORDER BY trader
+ON CONFLICT (address) DO NOTHING;
+
+INSERT INTO labs_solo.dim_flow_source (flow_source)
+SELECT DISTINCT COALESCE(flow_source, 'Other') FROM labs_solo.pool_swap_fact_unichain_wide
+ORDER BY 1
+ON CONFLICT (flow_source) DO NOTHING;
+
+-- Copy the rows in time order, so the BRIN indexes stay tight. The rollup
+-- triggers are attached only afterwards: the rollups already count these rows.
+INSERT INTO labs_solo.pool_swap_fact_unichain_base (
+    block_time, tx_hash, log_index, pool_id, token0_id, token1_id, amount0, amount1,
+    price0_usd, price1_usd, trader_id, is_contract, flow_source_id, hop_index, gas_used,
+    created_at, updated_at
+)
+SELECT
+    f.block_time, f.tx_hash, f.log_index, p.pool_id, t0.token_id, t1.token_id, f.amount0, f.amount1,
+    f.price0_usd, f.price1_usd, tr.trader_id, f.is_contract, fs.flow_source_id, f.hop_index, f.gas_used,
+    f.created_at, f.updated_at
+FROM labs_solo.pool_swap_fact_unichain_wide f
+JOIN labs_solo.dim_pool p ON p.pool_address = f.pool_address
+JOIN labs_solo.dim_token t0 ON t0.token_address = f.token0
+JOIN labs_solo.dim_token t1 ON t1.token_address = f.token1
+JOIN labs_solo.dim_trader tr ON tr.address = f.trader
+JOIN labs_solo.dim_flow_source fs ON fs.flow_source = COALESCE(f.flow_source, 'Other')
+ORDER BY f.block_time;
+
+DO $$
+BEGIN
+    IF (SELECT COUNT(*) FROM labs_solo.pool_swap_fact_unichain_base)
+       <> (SELECT COUNT(*) FROM labs_solo.pool_swap_fact_unichain_wide) THEN
+        RAISE EXCEPTION 'row counts differ after copying into the keyed fact table';
+    END IF;
+END;
+$$;
+
+-- Derived amounts, volume and gas costs, before the triggers are attached
+SELECT labs_solo.recompute_fact_amounts();
+
+ANALYZE labs_solo.dim_pool;
+ANALYZE labs_solo.dim_token;
+ANALYZE labs_solo.dim_trader;
+ANALYZE labs_solo.dim_flow_source;
+ANALYZE labs_solo.pool_swap_fact_unichain_base;
+
+\ir ../ddl/06_rollups.sql
+
+-- Databases coming from 001_partition_swap_tables.sql may predate the rollups
+SELECT labs_solo.rebuild_rollups()
+WHERE NOT EXISTS (SELECT 1 FROM labs_solo.pool_volume_hour)
+  AND EXISTS (SELECT 1 FROM labs_solo.pool_swap_fact_unichain_base);
+
+-- Once verified:
+--   DROP TABLE labs_solo.pool_swap_fact_unichain_wide;